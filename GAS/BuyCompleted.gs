@@ -70,7 +70,8 @@ function refreshDashboard() {
     logInfo(`${Object.keys(formulas).length}個の数式を保存しました`);
     
     // Step 2: 数式をクリア
-    formulaCells.forEach(cell => {
+    // ※ Python側（profit_rollup.py）が値で書き込んだセルは数式がないため消さない
+    Object.keys(formulas).forEach(cell => {
       dashboardSheet.getRange(cell).clear();
     });
     
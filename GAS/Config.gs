@@ -49,7 +49,8 @@ const CONFIG = {
     PRICE: 5,          // E列
     UPDATED: 6,        // F列
     PRICE_CHANGE: 7,   // G列（旧H列）
-    CHECKBOX: 8        // H列（旧I列）
+    CHECKBOX: 8,       // H列（旧I列）
+    BUYER: 9           // I列（最高価格の買取業者、Python側で書き込み）
   },
   
   // 列番号定義（買取完了シート）
@@ -0,0 +1,271 @@
+"""
+ISBNファイルの一括査定（コマンドライン）
+
+スプレッドシートを使わずに、ファイルまたは標準入力のISBN（CSVまたは1行1件）を
+価格更新と同じ取得処理（ValueBooksScraper + PricePipeline）で査定し、
+終わったものから順にJSON Lines形式で出力する。
+
+- 取得結果はローカルの価格キャッシュ（price_cache.py）に保存し、有効期限内なら再取得しない
+- 出力ファイルが既にある場合は、取得済み（status が ok / invalid）のISBNを飛ばして追記する
+  （中断後に同じコマンドを再実行すると続きから処理される）
+
+使い方:
+    python batch_lookup.py isbns.csv -o results.jsonl --workers 3
+    cat isbns.txt | python batch_lookup.py - > results.jsonl
+
+出力（1行1件）:
+    {"isbn": "...", "status": "ok", "price": 150, "title": "...", "source": "live", ...}
+    status: ok（price 0 は買取不可）/ error（error_type, error あり）/ invalid（ISBNとして不正）
+    source: live（ValueBooksから取得）/ cache（価格キャッシュ）
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from pipeline import PricePipeline
+from price_cache import DEFAULT_PRICE_CACHE_PATH, DEFAULT_PRICE_CACHE_TTL_SECONDS, PriceCache
+
+logger = logging.getLogger(__name__)
+
+# Statuses that are not retried when resuming
+FINAL_STATUSES = ('ok', 'invalid')
+
+_ISBN_PATTERN = re.compile(r'\d{9}[\dX]|\d{13}')
+
+
+def normalize_isbn(value):
+    """
+    Normalize an ISBN (remove hyphens and spaces)
+
+    Args:
+        value: Raw value
+
+    Returns:
+        str: ISBN-10 or ISBN-13 (None if not an ISBN)
+    """
+    isbn = re.sub(r'[\s\-]', '', str(value)).upper()
+    return isbn if _ISBN_PATTERN.fullmatch(isbn) else None
+
+
+def read_isbns(stream, column=0):
+    """
+    Read ISBNs from CSV or one-per-line text, lazily
+
+    A header row containing an 'ISBN' cell selects that column.
+
+    Args:
+        stream: Text stream
+        column: Column index when there is no header row
+
+    Yields:
+        tuple: (line number, raw value, normalized ISBN or None)
+    """
+    for line_number, row in enumerate(csv.reader(stream), start=1):
+        if not row or not ''.join(row).strip():
+            continue
+        if line_number == 1:
+            header = [cell.strip().upper() for cell in row]
+            if 'ISBN' in header:
+                column = header.index('ISBN')
+                continue
+        raw = row[column].strip() if column < len(row) else ''
+        yield line_number, raw, normalize_isbn(raw)
+
+
+def load_finished_isbns(output_path):
+    """
+    Read a partial output file for resuming
+
+    A truncated last line (interrupted write) is removed from the file.
+
+    Args:
+        output_path: JSON Lines output path
+
+    Returns:
+        set: ISBNs (raw values for invalid lines) that need no further processing
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            logger.warning(f"[BATCH] Removing truncated last line of {output_path}")
+            f.truncate(end)
+
+    finished = set()
+    for line in data[:end].decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('status') in FINAL_STATUSES:
+            finished.add(record['isbn'])
+    return finished
+
+
+class BatchLookup:
+    """Prices a stream of ISBNs and writes JSON Lines as results complete"""
+
+    def __init__(self, scrapers, output, cache=None):
+        """
+        Initialize
+
+        Args:
+            scrapers: ValueBooksScraper per fetch worker
+            output: Writable text stream for JSON Lines
+            cache: PriceCache (None to always fetch)
+        """
+        self.scrapers = scrapers
+        self.output = output
+        self.cache = cache
+        self.stats = {'ok': 0, 'error': 0, 'invalid': 0, 'cache': 0, 'live': 0}
+        # Invalid lines are written from the producer thread, results from the writer
+        self._output_lock = threading.Lock()
+
+    def run(self, items):
+        """
+        Price every item
+
+        Args:
+            items: Iterable of {isbn, row}
+
+        Returns:
+            dict: Counts by status and source
+        """
+        # One result per write batch so every line is streamed as soon as it is fetched
+        pipeline = PricePipeline([self._fetcher(scraper) for scraper in self.scrapers], self._write, batch_size=1)
+        pipeline.run(items)
+        pipeline.log_summary()
+        return self.stats
+
+    def write_invalid(self, raw, line_number):
+        """
+        Write a line for an input value that is not an ISBN
+
+        Args:
+            raw: Raw input value
+            line_number: Input line number
+        """
+        self._emit({'isbn': raw, 'status': 'invalid', 'line': line_number})
+
+    def _fetcher(self, scraper):
+        def fetch(item):
+            cached = self.cache.get(item['isbn']) if self.cache else None
+            if cached:
+                return {'item': item, 'result': cached, 'error_type': None, 'error': None,
+                        'source': 'cache', 'elapsed_seconds': 0.0}
+
+            started = time.monotonic()
+            outcome = scraper._fetch_price(item)
+            outcome['source'] = 'live'
+            outcome['elapsed_seconds'] = round(time.monotonic() - started, 2)
+            if outcome['result'] and self.cache:
+                self.cache.put(outcome['result'])
+            return outcome
+        return fetch
+
+    def _write(self, outcomes):
+        for outcome in outcomes:
+            item = outcome['item']
+            result = outcome['result']
+            record = {'isbn': item['isbn'], 'line': item['row'], 'source': outcome['source'],
+                      'elapsed_seconds': outcome['elapsed_seconds']}
+            if result:
+                record['status'] = 'ok'
+                for key in ('price', 'title', 'author', 'publisher', 'price_date', 'buyer', 'offers'):
+                    if key in result:
+                        record[key] = result[key]
+            else:
+                record.update({'status': 'error', 'error_type': outcome['error_type'], 'error': outcome['error']})
+            self.stats[outcome['source']] += 1
+            self._emit(record)
+
+    def _emit(self, record):
+        with self._output_lock:
+            self.stats[record['status']] += 1
+            self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.output.flush()
+
+
+def main():
+    """Price ISBNs from a file or stdin and stream JSON Lines"""
+    parser = argparse.ArgumentParser(description='Price ISBNs without a spreadsheet (JSON Lines output)')
+    parser.add_argument('input', help="ISBN file (CSV or one per line), '-' for stdin")
+    parser.add_argument('-o', '--output', help='JSON Lines output file (resumed if it exists; default: stdout)')
+    parser.add_argument('--workers', type=int, default=1, help='Fetch workers, one browser each (default: 1)')
+    parser.add_argument('--column', type=int, default=0, help='CSV column index without an ISBN header (default: 0)')
+    parser.add_argument('--cache', default=DEFAULT_PRICE_CACHE_PATH, help='Price cache database')
+    parser.add_argument('--cache-ttl-hours', type=float, default=DEFAULT_PRICE_CACHE_TTL_SECONDS / 3600,
+                        help='Use cached prices younger than this (0 to disable the cache)')
+    parser.add_argument('--buyers', help='Buyers to compare, comma separated (default: ValueBooks only)')
+    parser.add_argument('--profile-dir', help='Persistent Chrome profile directory (keeps the HTTP cache)')
+    parser.add_argument('--show-browser', action='store_true', help='Run Chrome with a window')
+    args = parser.parse_args()
+
+    # Results go to stdout, logs to stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from book_price_fetcher import ValueBooksScraper
+
+    finished = load_finished_isbns(args.output) if args.output else set()
+    if finished:
+        logger.info(f"[BATCH] Resuming: {len(finished)} ISBNs already in {args.output}")
+
+    cache = PriceCache(args.cache, ttl_seconds=args.cache_ttl_hours * 3600) if args.cache_ttl_hours > 0 else None
+    buyers = [name for name in (args.buyers or '').split(',') if name.strip()] or None
+    input_stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8-sig', newline='')
+    output = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+
+    scrapers = []
+    try:
+        for idx in range(max(1, args.workers)):
+            # Chrome locks its profile, so each worker keeps its own cache
+            profile_dir = f"{args.profile_dir}-{idx + 1}" if args.profile_dir else None
+            scrapers.append(ValueBooksScraper(credentials_file=None, headless=not args.show_browser,
+                                              buyers=buyers, profile_dir=profile_dir))
+        batch = BatchLookup(scrapers, output, cache)
+
+        def pending_items():
+            seen = set(finished)
+            for line_number, raw, isbn in read_isbns(input_stream, args.column):
+                if isbn is None:
+                    if raw not in seen:
+                        seen.add(raw)
+                        batch.write_invalid(raw, line_number)
+                    continue
+                if isbn in seen:
+                    continue
+                seen.add(isbn)
+                yield {'isbn': isbn, 'row': line_number}
+
+        started = time.monotonic()
+        stats = batch.run(pending_items())
+        logger.info(f"[BATCH] Completed in {time.monotonic() - started:.1f}s: {stats['ok']} ok, "
+                    f"{stats['error']} errors, {stats['invalid']} invalid "
+                    f"({stats['cache']} from cache, {stats['live']} fetched)")
+    finally:
+        for scraper in scrapers:
+            scraper.close()
+        if cache:
+            cache.log_summary()
+            cache.close()
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if stats['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,22 +10,32 @@ ISBNリストシート列構成:
 - F列(6): 価格更新日時
 - G列(7): 価格増減
 - H列(8): チェックボックス
+- I列(9): 買取業者（複数業者比較時、最高価格の業者）
 """
 
+import os
 import time
 import logging
+import threading
+from collections import deque
 from datetime import datetime
 import pytz
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import re
+from urllib3.exceptions import HTTPError as DriverConnectionError
+from sheets_quota import SheetsQuotaGovernor, create_sheets_client
+from storage import SheetsPriceStore, SQLitePriceStore
+from session_replay import REPLAY_CHROME_ARGUMENTS, ReplayServer, SessionRecorder
+from pipeline import PricePipeline
+from buyers import BuyerComparator, create_adapters
+import browser_cache
+from retry_queue import FailureRecord, RetryQueue, get_retry_policy
 
 # Google Cloud Logging setup
 import google.cloud.logging
@@ -59,20 +69,68 @@ except Exception as e:
     logger.warning(f"Cloud Logging initialization failed, using standard logging: {e}")
 
 
+# ValueBooks purchase estimate page
+ESTIMATE_URL = "https://www.valuebooks.jp/estimate/guide"
+
+# Default SQLite database path (storage='sqlite')
+DEFAULT_SQLITE_PATH = '/tmp/book_prices.db'
+
+# Maximum per-lookup browser cache metrics kept per scraper
+LOOKUP_METRICS_LIMIT = 1000
+
 
 class ValueBooksScraper:
     """Scraper to fetch used book purchase prices from ValueBooks.jp"""
     
-    def __init__(self, credentials_file, headless=True):
+    def __init__(self, credentials_file, headless=True, storage='sheets', sqlite_path=None,
+                 record_path=None, replay_path=None, fetch_workers=1, buyers=None, profiler=None,
+                 profile_dir=None, cache_size_mb=browser_cache.DEFAULT_CACHE_SIZE_MB):
         """
         Initialize
         
         Args:
-            credentials_file: Google Sheets API credentials file
+            credentials_file: Google Sheets API credentials file (None to run without spreadsheet)
             headless: Whether to run in headless mode
+            storage: Storage backend ('sheets' or 'sqlite')
+            sqlite_path: SQLite database file path (storage='sqlite' only)
+            record_path: Archive path to record ValueBooks sessions into (None to disable)
+            replay_path: Recorded archive to replay instead of accessing ValueBooks (None to disable)
+            fetch_workers: Number of fetch workers (each runs its own browser)
+            buyers: Buyer names to compare, e.g. ['valuebooks'] (None for ValueBooks only)
+            profiler: RunProfiler receiving checkpoints (None to disable)
+            profile_dir: Persistent Chrome profile directory; keeps the HTTP cache across
+                         ISBNs and runs (None for a fresh temporary profile)
+            cache_size_mb: Disk cache size cap (MB, profile_dir only)
         """
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.cache_size_mb = cache_size_mb
+        # Bounded: scrapers kept warm by PriceLookupService live as long as the instance
+        self.lookup_metrics = deque(maxlen=LOOKUP_METRICS_LIMIT)
+        self.headless = headless
+        self.fetch_workers = max(1, fetch_workers)
+        self.storage = storage
+        self.sqlite_path = sqlite_path or DEFAULT_SQLITE_PATH
+        self.estimate_url = ESTIMATE_URL
+        self.record_path = record_path
+        self.replay_path = replay_path
+        self.recorder = SessionRecorder(record_path) if record_path else None
+        self.replay_server = ReplayServer(replay_path) if replay_path else None
+        if self.replay_server:
+            self.estimate_url = self.replay_server.estimate_url
         self.driver = self._setup_driver(headless)
-        self.sheet_client = self._setup_google_sheets(credentials_file)
+        # Buyer adapters sharing this browser take turns on it
+        self.browser_lock = threading.Lock()
+        if self.profile_dir:
+            # Drop cookies and site storage left by the previous run, keep the HTTP cache
+            try:
+                browser_cache.clear_lookup_state(self.driver, self.estimate_url)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to clear previous session state: {e}")
+        self.quota_governor = SheetsQuotaGovernor()
+        self.sheet_client = self._setup_google_sheets(credentials_file) if credentials_file else None
+        self.buyers = buyers
+        self.comparator = BuyerComparator(create_adapters(buyers, self)) if buyers else None
     
     def _setup_driver(self, headless=True):
         """
@@ -132,6 +190,22 @@ class ValueBooksScraper:
         options.add_argument('--window-size=1280,720')
         logger.info("[OPTION] Set window size: 1280x720")
         
+        # Record / replay mode
+        if self.recorder:
+            SessionRecorder.configure_options(options)
+            logger.info("[OPTION] Enabled performance logging (session recording)")
+        if self.replay_server:
+            for argument in REPLAY_CHROME_ARGUMENTS:
+                options.add_argument(argument)
+                logger.info(f"[OPTION] Added: {argument} (session replay)")
+        
+        # Persistent profile: reuse the HTTP disk cache across ISBNs and runs
+        if self.profile_dir:
+            browser_cache.prepare_profile_dir(self.profile_dir, self.cache_size_mb)
+            for argument in browser_cache.chrome_profile_arguments(self.profile_dir, self.cache_size_mb):
+                options.add_argument(argument)
+                logger.info(f"[OPTION] Added: {argument} (persistent profile)")
+        
         logger.info("Creating Chrome WebDriver instance...")
         try:
             driver = webdriver.Chrome(options=options)
@@ -169,18 +243,30 @@ class ValueBooksScraper:
             credentials_file: Credentials file path
             
         Returns:
-            gspread.Client: Google Sheets client
+            QuotaGovernedClient: Google Sheets client (all requests are quota-governed)
         """
         logger.info("Setting up Google Sheets API...")
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, scope)
-        client = gspread.authorize(credentials)
+        client = create_sheets_client(credentials_file, self.quota_governor)
         logger.info("Google Sheets API configured successfully")
         return client
     
+    def _open_store(self, spreadsheet_id):
+        """
+        Open storage backend
+        
+        Args:
+            spreadsheet_id: Google Spreadsheet ID
+            
+        Returns:
+            PriceStore: SheetsPriceStore, or SQLitePriceStore synced to the spreadsheet
+        """
+        sheets_store = SheetsPriceStore(self.sheet_client, spreadsheet_id)
+        if self.storage == 'sqlite':
+            logger.info(f"Storage backend: SQLite ({self.sqlite_path}) synced to spreadsheet")
+            return SQLitePriceStore(self.sqlite_path, mirror=sheets_store)
+        logger.info("Storage backend: Google Sheets")
+        return sheets_store
+    
     def search_isbn_estimate(self, isbn):
         """
         Search ISBN on ValueBooks.jp purchase estimate page
@@ -190,7 +276,38 @@ class ValueBooksScraper:
             
         Returns:
             dict: Book information {isbn, title, author, publisher, price, price_date}
-                  None if not found
+                  None if the page loaded but no result could be read
+            
+        Raises:
+            Exception: Browser, timeout and network errors
+        """
+        # Recording mode: capture every page and response of this lookup
+        if self.recorder:
+            self.recorder.start(self.driver, isbn)
+        self._page_metrics = []
+        started = time.time()
+        book_info = None
+        try:
+            book_info = self._lookup_estimate(isbn)
+            return book_info
+        finally:
+            elapsed = time.time() - started
+            self.lookup_metrics.append(browser_cache.lookup_metrics(isbn, self._page_metrics, elapsed))
+            if self.recorder:
+                self.recorder.finish(self.driver, book_info, elapsed)
+    
+    def _lookup_estimate(self, isbn):
+        """
+        Look up purchase estimate on ValueBooks.jp
+        
+        Args:
+            isbn: ISBN to search
+            
+        Returns:
+            dict: Book information (None if the page loaded but no result could be read)
+            
+        Raises:
+            Exception: Browser, timeout and network errors (classified by _fetch_price)
         """
         logger.info(f"==============================")
         logger.info(f"ISBN PURCHASE ESTIMATE START: {isbn}")
@@ -198,7 +315,7 @@ class ValueBooksScraper:
         
         try:
             # Access purchase estimate page
-            estimate_url = "https://www.valuebooks.jp/estimate/guide"
+            estimate_url = self.estimate_url
             logger.info(f"[STEP 1] Accessing purchase estimate page: {estimate_url}")
             try:
                 self.driver.get(estimate_url)
@@ -211,91 +328,92 @@ class ValueBooksScraper:
             logger.info("[STEP 2] Waiting for page to load (3 seconds)...")
             time.sleep(3)
             logger.info("✅ Page load wait completed")
+            self._page_metrics.append(browser_cache.collect_page_metrics(self.driver))
+            if self.recorder:
+                self.recorder.capture(self.driver, 'guide')
             
             # Find ISBN input form
-            try:
-                logger.info("[STEP 3] Searching for ISBN input form...")
-                
-                # Try multiple selectors
-                input_selectors = [
-                    "input[placeholder*='気になる本']",
-                    "input[placeholder*='検索']",
-                    "input[type='search']",
-                    "input[id^='input-']",
-                    ".v-autocomplete input",
-                    ".search-input input",
-                    "input[type='text']",
-                ]
-                
-                isbn_input = None
-                for idx, selector in enumerate(input_selectors, 1):
-                    try:
-                        logger.info(f"  Trying selector {idx}/{len(input_selectors)}: {selector}")
-                        isbn_input = WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        logger.info(f"✅ ISBN input form found with selector: {selector}")
-                        break
-                    except TimeoutException:
-                        logger.info(f"  ⏭️  Selector {idx} failed, trying next...")
-                        continue
-                
-                if not isbn_input:
-                    logger.error("❌ Input form not found with any selector")
-                    return None
-                
-                placeholder = isbn_input.get_attribute('placeholder')
-                logger.info(f"Input form placeholder: '{placeholder}'")
-                
-                # Input ISBN
-                logger.info("[STEP 4] Clearing input form...")
-                isbn_input.clear()
-                time.sleep(0.5)
-                logger.info("✅ Input form cleared")
-                
-                # Input character by character (more human-like)
-                logger.info(f"[STEP 5] Inputting ISBN character by character: {isbn}")
-                for i, char in enumerate(isbn):
-                    isbn_input.send_keys(char)
-                    time.sleep(0.1)
-                    if (i + 1) % 3 == 0:  # Log every 3 characters
-                        logger.info(f"  Progress: {i + 1}/{len(isbn)} characters input")
-                
-                logger.info(f"✅ ISBN input completed: {isbn}")
-                
-                # Execute search with Enter key
-                logger.info("[STEP 6] Waiting 1 second before executing search...")
-                time.sleep(1)
-                logger.info("Executing search with Enter key...")
-                isbn_input.send_keys(Keys.RETURN)
-                logger.info("✅ Enter key sent")
-                
-                # Wait for result page transition
-                logger.info("[STEP 7] Waiting for search results (5 seconds)...")
-                time.sleep(5)
-                current_url = self.driver.current_url
-                logger.info(f"✅ Search completed. Current URL: {current_url}")
-                
-                # Extract book information
-                logger.info("[STEP 8] Extracting book information...")
-                book_info = self._extract_estimate_result(isbn)
-                
-                if book_info:
-                    logger.info(f"✅ Successfully retrieved: {book_info['title']} - ¥{book_info['price']}")
-                else:
-                    logger.warning(f"⚠️ Failed to extract book information")
-                
-                logger.info(f"==============================")
-                return book_info
-                
-            except TimeoutException:
-                logger.error("❌ Input form not found (timeout)")
+            logger.info("[STEP 3] Searching for ISBN input form...")
+            
+            # Try multiple selectors
+            input_selectors = [
+                "input[placeholder*='気になる本']",
+                "input[placeholder*='検索']",
+                "input[type='search']",
+                "input[id^='input-']",
+                ".v-autocomplete input",
+                ".search-input input",
+                "input[type='text']",
+            ]
+            
+            isbn_input = None
+            for idx, selector in enumerate(input_selectors, 1):
+                try:
+                    logger.info(f"  Trying selector {idx}/{len(input_selectors)}: {selector}")
+                    isbn_input = WebDriverWait(self.driver, 5).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                    )
+                    logger.info(f"✅ ISBN input form found with selector: {selector}")
+                    break
+                except TimeoutException:
+                    logger.info(f"  ⏭️  Selector {idx} failed, trying next...")
+                    continue
+            
+            if not isbn_input:
+                logger.error("❌ Input form not found with any selector")
                 return None
             
+            placeholder = isbn_input.get_attribute('placeholder')
+            logger.info(f"Input form placeholder: '{placeholder}'")
+            
+            # Input ISBN
+            logger.info("[STEP 4] Clearing input form...")
+            isbn_input.clear()
+            time.sleep(0.5)
+            logger.info("✅ Input form cleared")
+            
+            # Input character by character (more human-like)
+            logger.info(f"[STEP 5] Inputting ISBN character by character: {isbn}")
+            for i, char in enumerate(isbn):
+                isbn_input.send_keys(char)
+                time.sleep(0.1)
+                if (i + 1) % 3 == 0:  # Log every 3 characters
+                    logger.info(f"  Progress: {i + 1}/{len(isbn)} characters input")
+            
+            logger.info(f"✅ ISBN input completed: {isbn}")
+            
+            # Execute search with Enter key
+            logger.info("[STEP 6] Waiting 1 second before executing search...")
+            time.sleep(1)
+            logger.info("Executing search with Enter key...")
+            isbn_input.send_keys(Keys.RETURN)
+            logger.info("✅ Enter key sent")
+            
+            # Wait for result page transition
+            logger.info("[STEP 7] Waiting for search results (5 seconds)...")
+            time.sleep(5)
+            current_url = self.driver.current_url
+            logger.info(f"✅ Search completed. Current URL: {current_url}")
+            self._page_metrics.append(browser_cache.collect_page_metrics(self.driver))
+            if self.recorder:
+                self.recorder.capture(self.driver, 'result')
+            
+            # Extract book information
+            logger.info("[STEP 8] Extracting book information...")
+            book_info = self._extract_estimate_result(isbn)
+            
+            if book_info:
+                logger.info(f"✅ Successfully retrieved: {book_info['title']} - ¥{book_info['price']}")
+            else:
+                logger.warning(f"⚠️ Failed to extract book information")
+            
+            logger.info(f"==============================")
+            return book_info
+            
         except Exception as e:
+            # Only "page loaded, nothing found" returns None; the caller classifies everything else
             logger.error(f"❌ Estimate error for ISBN {isbn}: {str(e)}")
-            logger.error(f"Error details:", exc_info=True)
-            return None
+            raise
     
     def _extract_estimate_result(self, isbn):
         """
@@ -448,6 +566,9 @@ class ValueBooksScraper:
             logger.info(f"[EXTRACT] Retrieved book information: '{book_info['title']}' - {book_info['price']} yen")
             return book_info
             
+        except WebDriverException:
+            # Browser failure (e.g. session lost), not an unreadable page
+            raise
         except Exception as e:
             logger.error(f"[EXTRACT] Error: {str(e)}")
             logger.error(f"[EXTRACT] Error details:", exc_info=True)
@@ -465,64 +586,37 @@ class ValueBooksScraper:
             logger.info("PRICE UPDATE PROCESS START")
             logger.info("============================================================")
             logger.info(f"Spreadsheet ID: {spreadsheet_id}")
+            self.quota_governor.reset_stats()
+            self.lookup_metrics.clear()
             
-            # Open spreadsheet
-            logger.info(f"Opening spreadsheet: {spreadsheet_id}")
-            spreadsheet = self.sheet_client.open_by_key(spreadsheet_id)
-            sheet = spreadsheet.worksheet('ISBNリスト')
-            
-            # Get all data
-            records = sheet.get_all_records()
-            logger.info(f"Total records retrieved: {len(records)}")
+            # Open storage backend
+            store = self._open_store(spreadsheet_id)
             
             # Get today's date (date part only, Japan time)
             today_date = self._get_jst_now().strftime('%Y/%m/%d')
             logger.info(f"Today's date (JST): {today_date}")
             
-            # Filter records: Only process records NOT updated today
-            MAX_PROCESS_COUNT = 10
-            records_to_process = []
-            already_updated_count = 0
+            # Load the retry queue: failed ISBNs first, quarantined ISBNs never
+            retry_queue = self._load_retry_queue(store)
             
+            # Load records NOT updated today
+            MAX_PROCESS_COUNT = 10
             logger.info("Filtering records to process...")
-            for idx, record in enumerate(records, start=2):  # start=2 for row number
-                isbn = str(record.get('ISBN', '')).strip()
-                
-                if not isbn:
-                    continue
-                
-                update_date_time = record.get('価格更新日時', '')
-                
-                # Check if already updated today (compare date part only)
-                if update_date_time:
-                    update_date_str = str(update_date_time).strip()
-                    if update_date_str:
-                        # Extract date part (format: "2025/12/05 12:34:56" or "2025/12/05")
-                        update_date = update_date_str.split(' ')[0]
-                        
-                        if update_date == today_date:
-                            already_updated_count += 1
-                            logger.debug(f"  Row {idx} (ISBN {isbn}): Already updated today, skipping")
-                            continue
-                
-                # Add to processing list with row number
-                records_to_process.append({
-                    'row': idx,
-                    'record': record,
-                    'isbn': isbn
-                })
-                
-                # Limit to MAX_PROCESS_COUNT
-                if len(records_to_process) >= MAX_PROCESS_COUNT:
-                    logger.info(f"  Reached maximum process count ({MAX_PROCESS_COUNT}), stopping filter")
-                    break
+            records_to_process, total_records, already_updated_count = store.load_due_rows(
+                today_date, MAX_PROCESS_COUNT,
+                priority_isbns=retry_queue.pending_isbns(),
+                skip_isbns=retry_queue.quarantined_isbns()
+            )
+            if self.profiler:
+                self.profiler.checkpoint('after_sheet_read')
             
             # Log filtering results
             logger.info("============================================================")
             logger.info("FILTERING RESULTS")
             logger.info("============================================================")
-            logger.info(f"Total records in sheet: {len(records)}")
+            logger.info(f"Total records in sheet: {total_records}")
             logger.info(f"Records already updated today: {already_updated_count}")
+            logger.info(f"Quarantined records (skipped): {len(retry_queue.quarantined_isbns())}")
             logger.info(f"Records to process this run: {len(records_to_process)} (max: {MAX_PROCESS_COUNT})")
             logger.info("============================================================")
             
@@ -532,121 +626,51 @@ class ValueBooksScraper:
                 logger.info("✅ ALL RECORDS ALREADY UPDATED TODAY")
                 logger.info("============================================================")
                 logger.info(f"Today's date: {today_date}")
-                logger.info(f"Total records: {len(records)}")
+                logger.info(f"Total records: {total_records}")
                 logger.info(f"Already updated: {already_updated_count}")
                 logger.info("All ISBNs have been updated today. Exiting early.")
                 logger.info("No processing needed. Process completed successfully.")
                 logger.info("============================================================")
+                store.close()
+                self.quota_governor.log_summary()
                 return  # Exit early - no processing needed
             
-            update_count = 0
-            error_count = 0
-            failed_isbns = []  # Record failed ISBNs
+            # Run fetch and write stages as a pipeline:
+            # sheet writes for finished ISBNs overlap with scraping of the next ones
+            self._run_stats = {'update_count': 0, 'succeeded_isbns': [], 'failures': []}
+            self._extra_fetchers = []
+            try:
+                # Browsers started before a failing one are closed in finally
+                fetchers = [self._fetch_price] + [
+                    fetcher._fetch_price for fetcher in self._create_extra_fetchers(self.fetch_workers - 1)
+                ]
+                if self.profiler:
+                    # cProfile only sees the thread it runs on
+                    fetchers = [self.profiler.wrap(fetcher) for fetcher in fetchers]
+                pipeline = PricePipeline(
+                    fetchers,
+                    lambda outcomes: self._write_price_batch(store, outcomes)
+                )
+                pipeline.run(records_to_process)
+            finally:
+                lookup_metrics = list(self.lookup_metrics) + [
+                    metrics for fetcher in self._extra_fetchers for metrics in fetcher.lookup_metrics
+                ]
+                self._close_extra_fetchers()
+            pipeline.log_summary()
+            browser_cache.log_cache_summary(lookup_metrics)
             
-            # Process filtered records
-            for item in records_to_process:
-                i = item['row']
-                record = item['record']
-                isbn = item['isbn']
-                
-                logger.info(f"Processing ({update_count + error_count + 1}/{len(records_to_process)}): ISBN {isbn} (Row {i})")
-                
-                # Wrap individual ISBN processing in try-except to continue even if one fails
-                try:
-                    # Get purchase price
-                    result = self.search_isbn_estimate(isbn)
-                    
-                    # Memory countermeasure: Clear page after each ISBN processing
-                    try:
-                        if self.driver:
-                            logger.info("Clearing page (memory release)...")
-                            self.driver.execute_script("window.localStorage.clear();")
-                            self.driver.execute_script("window.sessionStorage.clear();")
-                            self.driver.delete_all_cookies()
-                            logger.info("✅ Page cleanup completed")
-                    except Exception as cleanup_error:
-                        logger.warning(f"⚠️ Page cleanup error: {cleanup_error}")
-                    
-                    if result:
-                        current_price = record.get('最新見積価格')
-                        new_price = result['price']
-                        
-                        # Convert current_price to number (None if empty string or None)
-                        if current_price == '' or current_price is None:
-                            previous_price = None
-                        else:
-                            try:
-                                previous_price = int(current_price)
-                            except (ValueError, TypeError):
-                                logger.warning(f"  Failed to convert price: '{current_price}' → treating as None")
-                                previous_price = None
-                        
-                        logger.info(f"  Current price: {current_price}")
-                        logger.info(f"  New price: {new_price}")
-                        logger.info(f"  previous_price (after conversion): {previous_price} (type: {type(previous_price)})")
-                        
-                        # Don't overwrite title if Google Books API info exists
-                        if not record.get('書籍名'):
-                            if result.get('title'):
-                                sheet.update_cell(i, 2, result['title'])
-                        
-                        # Update price
-                        sheet.update_cell(i, 5, new_price)  # Column E (最新見積価格)
-                        
-                        # Set update datetime (Japan time)
-                        update_time = self._get_jst_now().strftime('%Y/%m/%d %H:%M:%S')
-                        sheet.update_cell(i, 6, update_time)  # Column F (価格更新日時)
-                        
-                        # Calculate price change
-                        if previous_price is not None:
-                            change = new_price - previous_price
-                            sheet.update_cell(i, 7, change)  # Column G (価格増減)
-                            logger.info(f"  → Updated: {previous_price}円 → {new_price}円 (change: {change:+d}円)")
-                        else:
-                            logger.info(f"  → New entry: {new_price}円")
-                        
-                        # Record in price history
-                        logger.info(f"  _add_price_history call started")
-                        try:
-                            self._add_price_history(spreadsheet, result, previous_price)
-                            logger.info(f"  _add_price_history call completed")
-                        except Exception as history_error:
-                            logger.error(f"  _add_price_history call error: {history_error}")
-                            logger.error(f"  Error details:", exc_info=True)
-                        
-                        update_count += 1
-                        logger.info(f"✅ ISBN {isbn} processed successfully")
-                    else:
-                        logger.error(f"❌ Failed to fetch purchase price: {isbn}")
-                        error_count += 1
-                        failed_isbns.append(isbn)  # Record failed ISBN
-                
-                except Exception as process_error:
-                    # Catch any unexpected error during individual ISBN processing
-                    error_type = type(process_error).__name__
-                    error_message = str(process_error)
-                    
-                    logger.error(f"❌ Unexpected error processing ISBN {isbn}")
-                    logger.error(f"   Error type: {error_type}")
-                    logger.error(f"   Error message: {error_message}")
-                    logger.error(f"   Error details:", exc_info=True)
-                    
-                    # Classify error type for better debugging
-                    if 'session' in error_message.lower() or 'driver' in error_message.lower() or 'chrome' in error_message.lower():
-                        logger.error(f"   → Classified as: SELENIUM_ERROR")
-                    elif 'timeout' in error_message.lower():
-                        logger.error(f"   → Classified as: TIMEOUT_ERROR")
-                    elif 'connection' in error_message.lower() or 'network' in error_message.lower():
-                        logger.error(f"   → Classified as: NETWORK_ERROR")
-                    elif 'memory' in error_message.lower():
-                        logger.error(f"   → Classified as: MEMORY_ERROR")
-                    else:
-                        logger.error(f"   → Classified as: UNKNOWN_ERROR")
-                    
-                    error_count += 1
-                    failed_isbns.append(isbn)
-                    logger.warning(f"⏭️ Skipping ISBN {isbn} and continuing to next item")
-                    # Continue to next ISBN despite error
+            # Retry failures on a fresh browser, then persist the retry queue
+            # (the queue, summary and store must be saved even if the retry fails)
+            try:
+                self._retry_failures(store, retry_queue)
+            except Exception as e:
+                logger.error(f"[RETRY] ❌ End-of-run retry failed: {e}", exc_info=True)
+            self._save_retry_queue(store, retry_queue)
+            
+            update_count = self._run_stats['update_count']
+            failed_isbns = [f"{failure['item']['isbn']} ({failure['error_type']})" for failure in self._run_stats['failures']]
+            error_count = len(failed_isbns)
             
             # Calculate statistics
             total_count = update_count + error_count
@@ -663,67 +687,350 @@ class ValueBooksScraper:
             logger.info("============================================================")
             
             # Write execution summary to spreadsheet
-            self._write_execution_summary(spreadsheet, update_count, error_count, failed_isbns)
+            self._write_execution_summary(store, update_count, error_count, failed_isbns)
+            store.close()
+            self.quota_governor.log_summary()
             
         finally:
             # Clean up resources
             self.close()
     
-    def _add_price_history(self, spreadsheet, book_info, previous_price):
+    def _create_extra_fetchers(self, count):
         """
-        Add price to price history sheet
+        Create additional scrapers (each with its own browser) for parallel fetch workers
         
         Args:
-            spreadsheet: Spreadsheet object
-            book_info: Book information dictionary
-            previous_price: Previous price (None for first registration)
+            count: Number of additional fetchers
+            
+        Returns:
+            list: ValueBooksScraper instances without spreadsheet access
+                  (also kept in self._extra_fetchers as they start)
+        """
+        self._extra_fetchers = []
+        for idx in range(count):
+            worker = idx + 2
+            logger.info(f"Starting additional fetch worker {worker}...")
+            # Chrome locks its profile, so each worker keeps its own cache
+            profile_dir = f"{self.profile_dir}-{worker}" if self.profile_dir else None
+            # Each worker records into its own archive (archives are single-writer)
+            record_path = None
+            if self.record_path:
+                base, ext = os.path.splitext(self.record_path)
+                record_path = f"{base}-{worker}{ext}"
+                logger.info(f"Fetch worker {worker} records to {record_path}")
+            self._extra_fetchers.append(
+                ValueBooksScraper(credentials_file=None, headless=self.headless, buyers=self.buyers,
+                                  profile_dir=profile_dir, cache_size_mb=self.cache_size_mb,
+                                  record_path=record_path, replay_path=self.replay_path)
+            )
+        return self._extra_fetchers
+    
+    def _close_extra_fetchers(self):
+        """Close browsers of additional fetch workers"""
+        for fetcher in getattr(self, '_extra_fetchers', []):
+            fetcher.close()
+        self._extra_fetchers = []
+    
+    def _clear_session_state(self):
+        """Clear page state after each ISBN (memory countermeasure)"""
+        try:
+            if self.driver:
+                logger.info("Clearing page (memory release)...")
+                self.driver.execute_script("window.localStorage.clear();")
+                self.driver.execute_script("window.sessionStorage.clear();")
+                self.driver.delete_all_cookies()
+                if self.profile_dir:
+                    # The profile persists: clear all cookies and the estimate site's storage, not the HTTP cache
+                    browser_cache.clear_lookup_state(self.driver, self.estimate_url)
+                logger.info("✅ Page cleanup completed")
+        except Exception as cleanup_error:
+            logger.warning(f"⚠️ Page cleanup error: {cleanup_error}")
+    
+    def _fetch_price(self, item):
+        """
+        Fetch stage: get purchase price for one ISBN (runs on a fetch worker thread)
+        
+        Args:
+            item: Item from load_due_rows
+            
+        Returns:
+            dict: Outcome {item, result, error_type, error}
         """
+        isbn = item['isbn']
+        logger.info(f"Processing: ISBN {isbn} (Row {item['row']})")
+        
+        # Wrap individual ISBN processing in try-except to continue even if one fails
         try:
-            logger.info("    [PRICE HISTORY] Record processing started")
-            logger.info(f"    [PRICE HISTORY] previous_price: {previous_price} (type: {type(previous_price)})")
-            logger.info(f"    [PRICE HISTORY] book_info['price']: {book_info['price']} (type: {type(book_info['price'])})")
-            logger.info(f"    [PRICE HISTORY] book_info['title']: {book_info['title']}")
-            
-            history_sheet = spreadsheet.worksheet('価格履歴')
-            
-            if previous_price is None:
-                # First registration → Always record
-                logger.info(f"    [PRICE HISTORY] First registration pattern")
-                change = 0
-                should_record = True
+            if self.comparator:
+                # Query all buyers concurrently and keep the best offer
+                result = self.comparator.lookup(isbn)
             else:
-                # 2nd+ registration → Record only if price changed
-                logger.info(f"    [PRICE HISTORY] 2nd+ registration pattern")
-                change = book_info['price'] - previous_price
-                should_record = (change != 0)
-            
-            logger.info(f"    [PRICE HISTORY] Price change amount: {change}円")
-            logger.info(f"    [PRICE HISTORY] Should record: {should_record}")
-            
-            if should_record:
-                row = [
-                    book_info['isbn'],
-                    book_info['title'],
-                    book_info['price_date'],
-                    book_info['price'],
-                    change
-                ]
-                logger.info(f"    [PRICE HISTORY] Record data: {row}")
-                history_sheet.append_row(row)
-                logger.info(f"    [PRICE HISTORY] ✅ Record success (change: {change:+d}円)")
+                result = self.search_isbn_estimate(isbn)
+            self._clear_session_state()
+            
+            if not result:
+                # The page loaded but no price could be read from it
+                logger.error(f"❌ Failed to fetch purchase price: {isbn}")
+                return {'item': item, 'result': None, 'error_type': 'LOOKUP_FAILED',
+                        'error': 'Failed to fetch purchase price'}
+            return {'item': item, 'result': result, 'error_type': None, 'error': None}
+        
+        except Exception as process_error:
+            # Catch any unexpected error during individual ISBN processing
+            error_type = type(process_error).__name__
+            error_message = str(process_error)
+            
+            logger.error(f"❌ Unexpected error processing ISBN {isbn}")
+            logger.error(f"   Error type: {error_type}")
+            logger.error(f"   Error message: {error_message}")
+            logger.error(f"   Error details:", exc_info=True)
+            
+            # Classify error type (selects the retry policy)
+            error_class = classify_fetch_error(process_error)
+            logger.error(f"   → Classified as: {error_class}")
+            logger.warning(f"⏭️ Skipping ISBN {isbn} and continuing to next item")
+            return {'item': item, 'result': None, 'error_type': error_class, 'error': error_message}
+    
+    def _write_price_batch(self, store, outcomes):
+        """
+        Write stage: write a batch of fetch outcomes to the store
+        
+        Args:
+            store: Storage backend
+            outcomes: List of outcomes from _fetch_price
+        """
+        updates = []
+        history_rows = []
+        succeeded = []
+        succeeded_outcomes = []
+        
+        for outcome in outcomes:
+            item = outcome['item']
+            isbn = item['isbn']
+            result = outcome['result']
+            if self.profiler:
+                self.profiler.isbn_done()
+            
+            if not result:
+                self._run_stats['failures'].append(outcome)
+                continue
+            
+            record = item['record']
+            current_price = record.get('最新見積価格')
+            new_price = result['price']
+            
+            # Convert current_price to number (None if empty string or None)
+            if current_price == '' or current_price is None:
+                previous_price = None
             else:
-                logger.info(f"    [PRICE HISTORY] ⏭️ No price change (skip recording)")
-                
+                try:
+                    previous_price = int(current_price)
+                except (ValueError, TypeError):
+                    logger.warning(f"  Failed to convert price: '{current_price}' → treating as None")
+                    previous_price = None
+            
+            # Set update datetime (Japan time)
+            update_time = self._get_jst_now().strftime('%Y/%m/%d %H:%M:%S')
+            
+            # Calculate price change
+            change = None
+            if previous_price is not None:
+                change = new_price - previous_price
+                logger.info(f"  ISBN {isbn} → Updated: {previous_price}円 → {new_price}円 (change: {change:+d}円)")
+            else:
+                logger.info(f"  ISBN {isbn} → New entry: {new_price}円")
+            
+            # Columns B (書籍名), E (最新見積価格), F (価格更新日時), G (価格増減)
+            # Don't overwrite title if Google Books API info exists
+            updates.append({
+                'item': item,
+                'title': None if record.get('書籍名') else result.get('title'),
+                'price': new_price,
+                'update_time': update_time,
+                'change': change,
+                'buyer': result.get('buyer')
+            })
+            
+            history_row = self._build_price_history_row(result, previous_price)
+            if history_row:
+                history_rows.append(history_row)
+            succeeded.append(isbn)
+            succeeded_outcomes.append(outcome)
+        
+        if not updates:
+            return
+        
+        try:
+            store.write_price_results(updates)
         except Exception as e:
-            logger.error(f"    [PRICE HISTORY] ❌ Error: {str(e)}")
+            logger.error(f"❌ Failed to write price batch: {e}", exc_info=True)
+            self._run_stats['failures'].extend(
+                {**outcome, 'result': None, 'error_type': 'WRITE_ERROR', 'error': str(e)}
+                for outcome in succeeded_outcomes
+            )
+            return
+        
+        # Record in price history
+        try:
+            store.append_price_history(history_rows)
+            logger.info(f"    [PRICE HISTORY] ✅ Recorded {len(history_rows)} rows")
+        except Exception as history_error:
+            logger.error(f"    [PRICE HISTORY] ❌ Error: {history_error}")
             logger.error(f"    [PRICE HISTORY] Error details:", exc_info=True)
+        
+        store.flush()
+        self._run_stats['update_count'] += len(succeeded)
+        self._run_stats['succeeded_isbns'].extend(succeeded)
+        logger.info(f"✅ Batch written: {', '.join(succeeded)}")
+    
+    def _load_retry_queue(self, store):
+        """
+        Load the retry queue from the store
+        
+        Args:
+            store: Storage backend
+            
+        Returns:
+            RetryQueue: Retry queue (empty if loading failed)
+        """
+        try:
+            records = [record for record in map(FailureRecord.from_row, store.load_retry_queue()) if record]
+        except Exception as e:
+            logger.error(f"[RETRY] ❌ Failed to load retry queue: {e}", exc_info=True)
+            records = []
+        retry_queue = RetryQueue(records)
+        retry_queue.log_summary()
+        return retry_queue
+    
+    def _retry_failures(self, store, retry_queue):
+        """
+        Retry failures once at the end of the run and record them in the retry queue
+        
+        Failures are retried sequentially according to their class's policy,
+        on a restarted browser if any policy asks for one. Each ISBN that still
+        fails is recorded once per run (one attempt), with its final error; if
+        the restart or the retry pass fails, the original failures are recorded.
+        
+        Args:
+            store: Storage backend
+            retry_queue: RetryQueue
+        """
+        try:
+            retry_items = [failure for failure in self._run_stats['failures']
+                           if get_retry_policy(failure['error_type']).retry_in_run]
+            if retry_items:
+                self._retry_in_run(store, retry_items)
+        finally:
+            failed_at = self._get_jst_now().strftime('%Y/%m/%d %H:%M:%S')
+            for isbn in self._run_stats['succeeded_isbns']:
+                retry_queue.record_success(isbn)
+            for failure in self._run_stats['failures']:
+                retry_queue.record_failure(failure['item']['isbn'], failure['error_type'], failure['error'],
+                                           failed_at)
+    
+    def _retry_in_run(self, store, retry_items):
+        """
+        Fetch failed items again and replace their failures with the new outcomes
+        
+        Args:
+            store: Storage backend
+            retry_items: Failures (from self._run_stats['failures']) to retry
+        """
+        logger.info("============================================================")
+        logger.info(f"END-OF-RUN RETRY: {len(retry_items)} items")
+        logger.info("============================================================")
+        policies = [get_retry_policy(failure['error_type']) for failure in retry_items]
+        try:
+            if any(policy.recycle_driver for policy in policies):
+                self._recycle_driver()
+            delay = max(policy.delay_seconds for policy in policies)
+            if delay:
+                logger.info(f"[RETRY] Waiting {delay} seconds before retry...")
+                time.sleep(delay)
+            outcomes = [self._fetch_price(failure['item']) for failure in retry_items]
+        except Exception as e:
+            logger.error(f"[RETRY] ❌ End-of-run retry aborted: {e}", exc_info=True)
+            return
+        
+        # Failures not retried stay failed; retried ones are replaced by their new outcome
+        failures = self._run_stats['failures']
+        retried = {id(failure) for failure in retry_items}
+        self._run_stats['failures'] = [failure for failure in failures if id(failure) not in retried]
+        succeeded_before = len(self._run_stats['succeeded_isbns'])
+        try:
+            self._write_price_batch(store, outcomes)
+        except Exception as e:
+            logger.error(f"[RETRY] ❌ Failed to write retry results: {e}", exc_info=True)
+            # Count the whole retry pass as failed
+            del self._run_stats['succeeded_isbns'][succeeded_before:]
+            self._run_stats['failures'] = failures
+            return
+        
+        logger.info(f"[RETRY] Recovered {len(self._run_stats['succeeded_isbns']) - succeeded_before}"
+                    f"/{len(retry_items)} items")
     
-    def _write_execution_summary(self, spreadsheet, success_count, error_count, failed_isbns):
+    def _save_retry_queue(self, store, retry_queue):
+        """
+        Persist the retry queue if it changed
+        
+        Args:
+            store: Storage backend
+            retry_queue: RetryQueue
+        """
+        retry_queue.log_summary()
+        if not retry_queue.changed:
+            return
+        try:
+            store.save_retry_queue(retry_queue.rows())
+            logger.info("[RETRY] ✅ Retry queue saved")
+        except Exception as e:
+            logger.error(f"[RETRY] ❌ Failed to save retry queue: {e}", exc_info=True)
+    
+    def _recycle_driver(self):
+        """Restart the browser (fresh session for retries)"""
+        logger.info("[RETRY] Restarting browser...")
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Error while closing browser: {e}")
+        self.driver = None
+        self.driver = self._setup_driver(self.headless)
+    
+    def _build_price_history_row(self, book_info, previous_price):
+        """
+        Build price history row
+        
+        Args:
+            book_info: Book information dictionary
+            previous_price: Previous price (None for first registration)
+            
+        Returns:
+            list: [ISBN, title, datetime, price, change] (None if price unchanged)
+        """
+        if previous_price is None:
+            # First registration → Always record
+            change = 0
+        else:
+            # 2nd+ registration → Record only if price changed
+            change = book_info['price'] - previous_price
+            if change == 0:
+                logger.info(f"    [PRICE HISTORY] ⏭️ No price change for {book_info['isbn']} (skip recording)")
+                return None
+        
+        return [
+            book_info['isbn'],
+            book_info['title'],
+            book_info['price_date'],
+            book_info['price'],
+            change
+        ]
+    
+    def _write_execution_summary(self, store, success_count, error_count, failed_isbns):
         """
         Write execution summary to Error Log sheet
         
         Args:
-            spreadsheet: Spreadsheet object
+            store: Storage backend
             success_count: Number of successful processes
             error_count: Number of failed processes
             failed_isbns: List of failed ISBNs
@@ -731,8 +1038,6 @@ class ValueBooksScraper:
         try:
             logger.info("[SUMMARY] Writing execution summary to spreadsheet...")
             
-            error_log_sheet = spreadsheet.worksheet('エラーログ')
-            
             # Get current Japan time
             execution_time = self._get_jst_now().strftime('%Y/%m/%d %H:%M:%S')
             
@@ -758,7 +1063,7 @@ class ValueBooksScraper:
             ]
             
             logger.info(f"[SUMMARY] Summary data: {summary_row}")
-            error_log_sheet.append_row(summary_row)
+            store.write_execution_summary(summary_row)
             logger.info(f"[SUMMARY] ✅ Execution summary written successfully")
             
             # Log summary to console
@@ -780,6 +1085,14 @@ class ValueBooksScraper:
     
     def close(self):
         """Clean up resources"""
+        if self.comparator:
+            self.comparator.close()
+            self.comparator = None
+        if self.recorder:
+            self.recorder.close()
+        if self.replay_server:
+            self.replay_server.close()
+            self.replay_server = None
         if self.driver:
             try:
                 logger.info("Closing browser...")
@@ -794,6 +1107,38 @@ class ValueBooksScraper:
                     pass
 
 
+def classify_fetch_error(error):
+    """
+    Classify an exception raised while fetching a price (selects the retry policy)
+    
+    Args:
+        error: Exception from search_isbn_estimate / BuyerComparator.lookup
+        
+    Returns:
+        str: SELENIUM_ERROR, TIMEOUT_ERROR, NETWORK_ERROR, MEMORY_ERROR or UNKNOWN_ERROR
+    """
+    message = str(error).lower()
+    if isinstance(error, MemoryError) or 'out of memory' in message:
+        return 'MEMORY_ERROR'
+    if isinstance(error, (TimeoutException, TimeoutError)):
+        return 'TIMEOUT_ERROR'
+    if isinstance(error, WebDriverException):
+        # Chrome reports unreachable sites as net::ERR_* (the browser itself is fine)
+        return 'NETWORK_ERROR' if 'net::err_' in message else 'SELENIUM_ERROR'
+    if isinstance(error, (DriverConnectionError, ConnectionError)):
+        # The scraper's only direct connection is to chromedriver: the browser is gone
+        return 'SELENIUM_ERROR'
+    if 'session' in message or 'driver' in message or 'chrome' in message:
+        return 'SELENIUM_ERROR'
+    if 'timeout' in message:
+        return 'TIMEOUT_ERROR'
+    if 'connection' in message or 'network' in message:
+        return 'NETWORK_ERROR'
+    if 'memory' in message:
+        return 'MEMORY_ERROR'
+    return 'UNKNOWN_ERROR'
+
+
 def main():
     """Main processing"""
     # Configuration
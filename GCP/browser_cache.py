@@ -0,0 +1,194 @@
+"""
+Chromeの永続プロファイルとディスクキャッシュ
+
+ISBNごと・実行ごとにValueBooksのJS/CSSを再ダウンロードしないよう、Chromeを永続プロファイル
+（ディスクキャッシュ付き）で起動する。検索結果に影響するCookie・ストレージはISBNごとに消去し、
+HTTPキャッシュだけを残す。
+
+ISBNごとの転送量・ページ読み込み時間を記録し、キャッシュの有無（warm/cold）別に集計する。
+"""
+
+import glob
+import logging
+import os
+import shutil
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE_MB = 200
+
+# Storage that can affect lookup results (the HTTP cache is intentionally not listed)
+LOOKUP_STORAGE_TYPES = 'cookies,local_storage,indexeddb,websql,service_workers,cache_storage'
+
+# Resource timing of the current document
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let transfer = nav ? nav.transferSize : 0;
+let decoded = nav ? nav.decodedBodySize : 0;
+let cached = 0;
+for (const r of resources) {
+  transfer += r.transferSize;
+  decoded += r.decodedBodySize;
+  if (r.transferSize === 0 && r.decodedBodySize > 0) cached++;
+}
+return {
+  time_origin: performance.timeOrigin,
+  transfer_bytes: transfer,
+  decoded_bytes: decoded,
+  resources: resources.length,
+  cached_resources: cached,
+  load_ms: nav && nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null
+};
+"""
+
+
+def prepare_profile_dir(profile_dir, cache_size_mb=DEFAULT_CACHE_SIZE_MB):
+    """
+    Prepare a persistent Chrome profile directory
+
+    Removes lock files left by a crashed Chrome and wipes the profile
+    if it has grown far beyond the cache cap.
+
+    Args:
+        profile_dir: Profile directory
+        cache_size_mb: Disk cache size cap (MB)
+    """
+    if os.path.isdir(profile_dir):
+        size_mb = _directory_size(profile_dir) / 1024 / 1024
+        if size_mb > cache_size_mb * 2:
+            logger.warning(f"[CACHE] Profile is {size_mb:.0f}MB (cap {cache_size_mb}MB), recreating")
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        else:
+            logger.info(f"[CACHE] Reusing profile: {profile_dir} ({size_mb:.1f}MB)")
+
+    os.makedirs(profile_dir, exist_ok=True)
+    for lock in glob.glob(os.path.join(profile_dir, 'Singleton*')):
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+
+
+def chrome_profile_arguments(profile_dir, cache_size_mb=DEFAULT_CACHE_SIZE_MB):
+    """
+    Get Chrome arguments for a persistent profile with a capped disk cache
+
+    Args:
+        profile_dir: Profile directory
+        cache_size_mb: Disk cache size cap (MB)
+
+    Returns:
+        list: Chrome arguments
+    """
+    return [
+        f'--user-data-dir={profile_dir}',
+        f'--disk-cache-dir={os.path.join(profile_dir, "cache")}',
+        f'--disk-cache-size={cache_size_mb * 1024 * 1024}',
+    ]
+
+
+def clear_lookup_state(driver, page_url):
+    """
+    Clear cookies and site storage that can affect results, keeping the HTTP cache
+
+    Args:
+        driver: WebDriver
+        page_url: URL of the site being looked up
+    """
+    parsed = urlparse(page_url)
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+        'origin': f'{parsed.scheme}://{parsed.netloc}',
+        'storageTypes': LOOKUP_STORAGE_TYPES,
+    })
+
+
+def collect_page_metrics(driver):
+    """
+    Collect transfer size and load time of the current document
+
+    Args:
+        driver: WebDriver
+
+    Returns:
+        dict: Page metrics (None if unavailable)
+    """
+    try:
+        return driver.execute_script(PAGE_METRICS_SCRIPT)
+    except Exception as e:
+        logger.debug(f"[CACHE] Failed to collect page metrics: {e}")
+        return None
+
+
+def lookup_metrics(isbn, page_metrics, elapsed_seconds):
+    """
+    Combine page metrics of one lookup
+
+    Documents with the same time origin are the same page (later samples
+    include earlier resources), so only the last sample per document counts.
+
+    Args:
+        isbn: ISBN
+        page_metrics: Page metrics collected during the lookup
+        elapsed_seconds: Lookup wall time
+
+    Returns:
+        dict: {isbn, transfer_bytes, load_ms, resources, cached_resources, cache, elapsed_seconds}
+    """
+    documents = {}
+    for metrics in page_metrics:
+        if metrics:
+            documents[metrics['time_origin']] = metrics
+
+    resources = sum(metrics['resources'] for metrics in documents.values())
+    cached = sum(metrics['cached_resources'] for metrics in documents.values())
+    return {
+        'isbn': isbn,
+        'transfer_bytes': sum(metrics['transfer_bytes'] for metrics in documents.values()),
+        'load_ms': sum(metrics['load_ms'] or 0 for metrics in documents.values()),
+        'resources': resources,
+        'cached_resources': cached,
+        # Cross-origin resources without Timing-Allow-Origin also report 0 bytes
+        'cache': 'warm' if resources and cached * 2 >= resources else 'cold',
+        'elapsed_seconds': elapsed_seconds,
+    }
+
+
+def log_cache_summary(metrics):
+    """
+    Log bytes downloaded and page-load time per ISBN, grouped by warm/cold cache
+
+    Args:
+        metrics: List of lookup metrics
+    """
+    if not metrics:
+        return
+    logger.info("============================================================")
+    logger.info("BROWSER CACHE STATISTICS")
+    logger.info("============================================================")
+    for cache in ('cold', 'warm'):
+        group = [m for m in metrics if m['cache'] == cache]
+        if not group:
+            continue
+        avg_kb = sum(m['transfer_bytes'] for m in group) / len(group) / 1024
+        avg_load = sum(m['load_ms'] for m in group) / len(group)
+        avg_elapsed = sum(m['elapsed_seconds'] for m in group) / len(group)
+        logger.info(f"{cache}: {len(group)} lookups, avg {avg_kb:.0f}KB downloaded, "
+                    f"avg page load {avg_load:.0f}ms, avg lookup {avg_elapsed:.1f}s")
+    for m in metrics:
+        logger.info(f"  ISBN {m['isbn']}: {m['transfer_bytes'] / 1024:.0f}KB, {m['load_ms']:.0f}ms "
+                    f"({m['cached_resources']}/{m['resources']} cached, {m['cache']})")
+    logger.info("============================================================")
+
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,220 @@
+"""
+買取完了への一括移行
+
+ISBNリストでチェックされた書籍を「買取完了_YYYY-MM-DD」シートへまとめて移行し、
+ISBNリストから削除、価格履歴から該当ISBNの行を削除する。
+（GASの moveToBuyCompleted は1件ずつ処理するため、件数が多いとタイムアウトする）
+
+API呼び出し回数は移行件数によらず一定:
+- 読み取り: ISBNリスト 1回、移行先シートA列 1回、価格履歴 1回
+- 書き込み: 移行先シート 1回、ISBNリストの行削除 1回、価格履歴の書き換え 1回
+"""
+
+import logging
+from datetime import datetime
+
+import pytz
+from gspread.utils import rowcol_to_a1
+
+from storage import ISBN_LIST_SHEET, PRICE_HISTORY_SHEET, ERROR_LOG_SHEET
+
+logger = logging.getLogger(__name__)
+
+BUY_COMPLETED_PREFIX = '買取完了_'
+BUY_COMPLETED_HEADER = ['ISBN', 'タイトル', '著者', '出版社', '最新見積価格', '売却価格', '利益', '登録日']
+
+# ISBNリスト columns (0-based)
+ISBN_COLUMN = 0
+TITLE_COLUMN = 1
+AUTHOR_COLUMN = 2
+PUBLISHER_COLUMN = 3
+PRICE_COLUMN = 4
+CHECKBOX_COLUMN = 7
+
+
+def today_sheet_name():
+    """
+    Get today's purchase sheet name (Japan time)
+
+    Returns:
+        str: Sheet name (e.g. "買取完了_2025-12-05")
+    """
+    return BUY_COMPLETED_PREFIX + datetime.now(pytz.timezone('Asia/Tokyo')).strftime('%Y-%m-%d')
+
+
+def move_checked_to_buy_completed(spreadsheet, target_sheet_name=None):
+    """
+    Move checked books from ISBNリスト to a purchase completion sheet
+
+    Args:
+        spreadsheet: gspread Spreadsheet
+        target_sheet_name: Destination sheet name (default: today's sheet)
+
+    Returns:
+        dict: {moved, sheet, history_deleted, history_error}
+              (history_error is None unless the price history purge failed)
+    """
+    target_sheet_name = target_sheet_name or today_sheet_name()
+    logger.info("============================================================")
+    logger.info(f"BUY COMPLETED MOVE START → {target_sheet_name}")
+    logger.info("============================================================")
+
+    # 1. Collect checked rows in one read
+    isbn_sheet = spreadsheet.worksheet(ISBN_LIST_SHEET)
+    values = isbn_sheet.get_all_values(value_render_option='UNFORMATTED_VALUE')
+
+    checked = []
+    for row_number, row in enumerate(values[1:], start=2):
+        row = list(row) + [''] * (CHECKBOX_COLUMN + 1 - len(row))
+        isbn = str(row[ISBN_COLUMN]).strip()
+        if isbn and row[CHECKBOX_COLUMN] is True:
+            checked.append((row_number, row))
+
+    if not checked:
+        logger.info("No checked books. Nothing to move.")
+        return {'moved': 0, 'sheet': target_sheet_name, 'history_deleted': 0, 'history_error': None}
+
+    logger.info(f"Checked books: {len(checked)}")
+
+    # 2. Append to the purchase sheet in one write
+    target_sheet = _get_or_create_buy_sheet(spreadsheet, target_sheet_name)
+    start_row = len(target_sheet.col_values(1)) + 1
+    registered_at = datetime.now(pytz.timezone('Asia/Tokyo')).strftime('%Y/%m/%d %H:%M:%S')
+
+    new_rows = []
+    for offset, (_, row) in enumerate(checked):
+        target_row = start_row + offset
+        new_rows.append([
+            row[ISBN_COLUMN],
+            row[TITLE_COLUMN],
+            row[AUTHOR_COLUMN],
+            row[PUBLISHER_COLUMN],
+            row[PRICE_COLUMN] or 0,             # E列: 見積価格
+            '',                                 # F列: 実際の買取価格（空白）
+            f'=F{target_row}-E{target_row}',    # G列: 差額
+            registered_at                       # H列: 登録日
+        ])
+
+    end_row = start_row + len(new_rows) - 1
+    target_sheet.update(range_name=f'A{start_row}:H{end_row}', values=new_rows,
+                        value_input_option='USER_ENTERED')
+    logger.info(f"✅ Appended {len(new_rows)} rows to {target_sheet_name} (rows {start_row}-{end_row})")
+
+    # 3. Remove from ISBNリスト in one batch request (bottom-up, contiguous ranges merged)
+    requests = [
+        {
+            'deleteDimension': {
+                'range': {
+                    'sheetId': isbn_sheet.id,
+                    'dimension': 'ROWS',
+                    'startIndex': first - 1,
+                    'endIndex': last
+                }
+            }
+        }
+        for first, last in reversed(_contiguous_ranges([row_number for row_number, _ in checked]))
+    ]
+    spreadsheet.batch_update({'requests': requests})
+    logger.info(f"✅ Removed {len(checked)} rows from {ISBN_LIST_SHEET}")
+
+    # 4. Purge price history in one filtered rewrite
+    moved_isbns = {str(row[ISBN_COLUMN]).strip() for _, row in checked}
+    history_deleted, history_error = _purge_price_history(spreadsheet, moved_isbns)
+
+    logger.info("============================================================")
+    if history_error:
+        logger.warning(f"BUY COMPLETED MOVE DONE: {len(checked)} books, ⚠️ price history purge failed")
+    else:
+        logger.info(f"BUY COMPLETED MOVE DONE: {len(checked)} books, {history_deleted} history rows deleted")
+    logger.info("============================================================")
+    return {'moved': len(checked), 'sheet': target_sheet_name,
+            'history_deleted': history_deleted, 'history_error': history_error}
+
+
+def _get_or_create_buy_sheet(spreadsheet, sheet_name):
+    """
+    Get purchase completion sheet, creating it with the header if missing
+
+    Args:
+        spreadsheet: gspread Spreadsheet
+        sheet_name: Sheet name
+
+    Returns:
+        gspread.Worksheet: Purchase completion sheet
+    """
+    worksheets = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+    if sheet_name in worksheets:
+        return worksheets[sheet_name]
+
+    # Insert right after the Error Log sheet, as the GAS menu does
+    # (Worksheet.index is 0-based; GAS getIndex() is 1-based, hence +1 here)
+    error_log = worksheets.get(ERROR_LOG_SHEET)
+    index = error_log.index + 1 if error_log else len(worksheets)
+    sheet = spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=len(BUY_COMPLETED_HEADER), index=index)
+    sheet.update(range_name='A1:H1', values=[BUY_COMPLETED_HEADER])
+    sheet.format('A1:H1', {
+        'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}},
+        'backgroundColor': {'red': 0.29, 'green': 0.525, 'blue': 0.91},
+        'horizontalAlignment': 'CENTER'
+    })
+    logger.info(f"Created new sheet: {sheet_name}")
+    return sheet
+
+
+def _purge_price_history(spreadsheet, isbns):
+    """
+    Delete price history rows of the given ISBNs by rewriting the sheet once
+
+    Args:
+        spreadsheet: gspread Spreadsheet
+        isbns: Set of ISBNs to delete
+
+    Returns:
+        tuple: (number of deleted rows, error message or None)
+    """
+    try:
+        history_sheet = spreadsheet.worksheet(PRICE_HISTORY_SHEET)
+        values = history_sheet.get_all_values(value_render_option='UNFORMATTED_VALUE')
+        rows = values[1:]
+        if not rows:
+            logger.info("[PRICE HISTORY] No history rows")
+            return 0, None
+
+        width = max(len(row) for row in rows)
+        kept = [list(row) + [''] * (width - len(row)) for row in rows if str(row[0]).strip() not in isbns]
+        deleted = len(rows) - len(kept)
+        if deleted == 0:
+            logger.info("[PRICE HISTORY] No rows to delete")
+            return 0, None
+
+        # Blank out the rows freed at the bottom in the same write
+        kept.extend([[''] * width for _ in range(deleted)])
+        history_sheet.update(range_name=f'A2:{rowcol_to_a1(len(rows) + 1, width)}', values=kept,
+                             value_input_option='RAW')
+        logger.info(f"[PRICE HISTORY] ✅ Deleted {deleted} rows")
+        return deleted, None
+
+    except Exception as e:
+        # The move itself has already completed, so report the failure instead of raising
+        logger.error(f"[PRICE HISTORY] ❌ Purge error: {e}", exc_info=True)
+        return 0, str(e)
+
+
+def _contiguous_ranges(row_numbers):
+    """
+    Group row numbers into contiguous ranges
+
+    Args:
+        row_numbers: Row numbers in ascending order
+
+    Returns:
+        list: [(first, last), ...]
+    """
+    ranges = []
+    for row_number in row_numbers:
+        if ranges and ranges[-1][1] == row_number - 1:
+            ranges[-1] = (ranges[-1][0], row_number)
+        else:
+            ranges.append((row_number, row_number))
+    return ranges
+
@@ -0,0 +1,248 @@
+"""
+買取業者アダプター
+
+業者ごとの検索・価格抽出をアダプターとして実装し、同じISBNを複数業者へ同時に問い合わせて
+最も高い買取価格と業者を記録する。
+1ISBNあたりの処理時間は「最も遅い業者1社分」に近くなる（業者数の合計にはならない）。
+
+業者の追加方法:
+1. BuyerAdapter を継承し、name と fetch(isbn) を実装
+2. BUYER_ADAPTERS に登録
+3. 環境変数 BUYERS（カンマ区切り）に追加
+"""
+
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Minimum interval between requests to the same buyer (CONFIG.SCRAPING.REQUEST_INTERVAL)
+DEFAULT_REQUEST_INTERVAL_SECONDS = 2.0
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Enforces a minimum interval between request starts"""
+
+    def __init__(self, min_interval):
+        """
+        Initialize
+
+        Args:
+            min_interval: Minimum seconds between requests
+        """
+        self.min_interval = min_interval
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Block until the next request is allowed
+
+        Returns:
+            float: Seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next_allowed - now)
+            self._next_allowed = max(now, self._next_allowed) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def get_rate_limiter(buyer_name, min_interval):
+    """
+    Get the rate limiter shared by every adapter instance of a buyer
+
+    Args:
+        buyer_name: Buyer name
+        min_interval: Minimum seconds between requests
+
+    Returns:
+        RateLimiter: Shared rate limiter
+    """
+    with _rate_limiters_lock:
+        if buyer_name not in _rate_limiters:
+            _rate_limiters[buyer_name] = RateLimiter(min_interval)
+        return _rate_limiters[buyer_name]
+
+
+class BuyerAdapter:
+    """Buyer adapter interface"""
+
+    name = None
+    request_interval = DEFAULT_REQUEST_INTERVAL_SECONDS
+
+    def __init__(self, browser_lock=None):
+        """
+        Initialize
+
+        Args:
+            browser_lock: Lock of the browser used by fetch (None if the adapter owns its browser);
+                          adapters sharing a browser must pass the same lock
+        """
+        self.rate_limiter = get_rate_limiter(self.name, self.request_interval)
+        # One lookup at a time per browser
+        self._lock = browser_lock or threading.Lock()
+
+    def lookup(self, isbn):
+        """
+        Look up purchase price, respecting the buyer's rate limit
+
+        Args:
+            isbn: ISBN
+
+        Returns:
+            dict: Book information with 'buyer' (None if lookup failed)
+        """
+        with self._lock:
+            self.rate_limiter.wait()
+            result = self.fetch(isbn)
+        if result:
+            result['buyer'] = self.name
+        return result
+
+    def fetch(self, isbn):
+        """
+        Look up and extract purchase price on the buyer's site
+
+        Args:
+            isbn: ISBN
+
+        Returns:
+            dict: Book information {isbn, title, author, publisher, price, price_date} (None if failed)
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources"""
+
+
+class ValueBooksAdapter(BuyerAdapter):
+    """ValueBooks.jp purchase estimate"""
+
+    name = 'ValueBooks'
+
+    def __init__(self, scraper):
+        """
+        Initialize
+
+        Args:
+            scraper: ValueBooksScraper whose browser is used for lookups
+                     (point scraper.estimate_url at a stand-in server to test)
+        """
+        # The browser belongs to the scraper: serialise on its lock, not a per-adapter one
+        super().__init__(browser_lock=scraper.browser_lock)
+        self.scraper = scraper
+
+    def fetch(self, isbn):
+        return self.scraper.search_isbn_estimate(isbn)
+
+
+# name (lower case) -> factory(scraper)
+BUYER_ADAPTERS = {
+    'valuebooks': ValueBooksAdapter,
+}
+
+
+def create_adapters(names, scraper):
+    """
+    Create buyer adapters
+
+    Args:
+        names: Buyer names (keys of BUYER_ADAPTERS, case-insensitive; duplicates are ignored)
+        scraper: ValueBooksScraper providing the browser
+
+    Returns:
+        list: BuyerAdapter instances, one per buyer
+    """
+    adapters = []
+    seen = set()
+    for name in names:
+        key = name.strip().lower()
+        factory = BUYER_ADAPTERS.get(key)
+        if factory is None:
+            raise ValueError(f"Unknown buyer: {name} (available: {', '.join(BUYER_ADAPTERS)})")
+        if key in seen:
+            logger.warning(f"[BUYERS] ⚠️ Duplicate buyer ignored: {name}")
+            continue
+        seen.add(key)
+        adapters.append(factory(scraper))
+    return adapters
+
+
+class BuyerComparator:
+    """Queries several buyers for the same ISBN concurrently and picks the best offer"""
+
+    def __init__(self, adapters):
+        """
+        Initialize
+
+        Args:
+            adapters: List of BuyerAdapter
+        """
+        names = [adapter.name for adapter in adapters]
+        if len(set(names)) != len(names):
+            # Results are keyed by buyer name
+            raise ValueError(f"Duplicate buyer adapters: {names}")
+        self.adapters = adapters
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(adapters)), thread_name_prefix='buyer')
+
+    def lookup(self, isbn):
+        """
+        Look up all buyers and return the best offer
+
+        Args:
+            isbn: ISBN
+
+        Returns:
+            dict: Best book information with 'buyer' and 'offers' {buyer: price or None}
+                  (None if no buyer had a price)
+
+        Raises:
+            Exception: First buyer error when no buyer had a price and at least one raised
+                       (lets the caller classify browser, timeout and network errors)
+        """
+        started = time.monotonic()
+        futures = {adapter.name: self._executor.submit(self._lookup_one, adapter, isbn) for adapter in self.adapters}
+        results = {}
+        errors = []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"[BUYERS] ❌ {name} lookup error for ISBN {isbn}: {e}")
+                results[name] = None
+                errors.append(e)
+
+        offers = {name: (result['price'] if result else None) for name, result in results.items()}
+        found = [result for result in results.values() if result]
+        logger.info(f"[BUYERS] ISBN {isbn} offers: {offers} ({time.monotonic() - started:.1f}s)")
+        if not found:
+            if errors:
+                raise errors[0]
+            return None
+
+        best = max(found, key=lambda result: result['price'])
+        best['offers'] = offers
+        logger.info(f"[BUYERS] Best offer: {best['buyer']} ¥{best['price']}")
+        return best
+
+    def close(self):
+        """Shut down worker threads and close adapters"""
+        self._executor.shutdown(wait=True)
+        for adapter in self.adapters:
+            adapter.close()
+
+    @staticmethod
+    def _lookup_one(adapter, isbn):
+        started = time.monotonic()
+        try:
+            return adapter.lookup(isbn)
+        finally:
+            logger.info(f"[BUYERS] {adapter.name} finished in {time.monotonic() - started:.1f}s")
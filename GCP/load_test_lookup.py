@@ -0,0 +1,142 @@
+"""
+単発ISBN検索の負荷テスト（ローカル）
+
+standin_pages.py の代替ページを相手に PriceLookupService へ同時リクエストを送り、
+応答時間の p50 / p99 をキャッシュヒット・ライブ取得別に表示する。
+同じISBNへの同時リクエストがまとめられていること（ライブ取得回数 = ISBN数）と、
+レイテンシ目標（price_lookup.py）を満たしていることを確認する。
+
+使い方:
+    python load_test_lookup.py --requests 200 --concurrency 20 --isbns 5 --browsers 2
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from price_cache import PriceCache
+from price_lookup import CACHE_HIT_LATENCY_TARGET_MS, LOOKUP_TIMEOUT_SECONDS, PriceLookupService
+from standin_pages import StandinServer
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile
+
+    Args:
+        values: Values
+        pct: Percentile (0-100)
+
+    Returns:
+        float: Percentile value (None if no values)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def main():
+    """Run concurrent lookups against a stand-in site and report latency percentiles"""
+    parser = argparse.ArgumentParser(description='Load-test the single-ISBN lookup service')
+    parser.add_argument('--requests', type=int, default=200, help='Total requests (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent clients (default: 20)')
+    parser.add_argument('--isbns', type=int, default=5, help='Distinct ISBNs requested (default: 5)')
+    parser.add_argument('--browsers', type=int, default=1, help='Browsers in the lookup pool (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stand-in response delay in seconds')
+    parser.add_argument('--timeout', type=float, default=LOOKUP_TIMEOUT_SECONDS,
+                        help=f'Lookup timeout in seconds (default: {LOOKUP_TIMEOUT_SECONDS})')
+    parser.add_argument('--show-browser', action='store_true', help='Run Chrome with a window')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    from book_price_fetcher import ValueBooksScraper
+
+    books = {f'978400000{idx:04d}': (f'負荷テスト書籍 {idx}', 100 + idx) for idx in range(args.isbns)}
+    server = StandinServer(books, latency=args.latency)
+
+    def create_scraper():
+        scraper = ValueBooksScraper(credentials_file=None, headless=not args.show_browser)
+        scraper.estimate_url = server.estimate_url
+        return scraper
+
+    cache_dir = tempfile.TemporaryDirectory()
+    cache = PriceCache(f'{cache_dir.name}/price_cache.db')
+    service = PriceLookupService(cache, create_scraper, browsers=args.browsers, timeout=args.timeout)
+
+    latencies = {'cache': [], 'live': []}
+    statuses = {}
+    lock = threading.Lock()
+    isbns = list(books)
+
+    def request(_):
+        isbn = random.choice(isbns)
+        started = time.monotonic()
+        result = service.lookup([isbn])[0]
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with lock:
+            latencies[result['source']].append(elapsed_ms)
+            statuses[result['status']] = statuses.get(result['status'], 0) + 1
+            if result['status'] == 'ok' and result['price'] != books[isbn][1]:
+                statuses['wrong_price'] = statuses.get('wrong_price', 0) + 1
+
+    try:
+        logger.info(f"[LOADTEST] Warming up {args.browsers} browsers...")
+        service.warm_up()
+
+        logger.info(f"[LOADTEST] {args.requests} requests, {args.concurrency} clients, {args.isbns} ISBNs")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(request, range(args.requests)))
+        wall = time.monotonic() - started
+    finally:
+        service.close()
+        cache.close()
+        server.close()
+        cache_dir.cleanup()
+
+    logger.info("============================================================")
+    logger.info("LOOKUP LOAD TEST RESULTS")
+    logger.info("============================================================")
+    logger.info(f"Wall time: {wall:.1f}s ({args.requests / wall:.1f} req/s)")
+    logger.info(f"Statuses: {statuses}")
+    logger.info(f"Service stats: {service.stats}")
+    for source in ('cache', 'live'):
+        values = latencies[source]
+        if values:
+            logger.info(f"{source:>5}: {len(values)} requests, p50 {percentile(values, 50):.1f}ms, "
+                        f"p99 {percentile(values, 99):.1f}ms, max {max(values):.1f}ms")
+    all_values = latencies['cache'] + latencies['live']
+    logger.info(f"  all: p50 {percentile(all_values, 50):.1f}ms, p99 {percentile(all_values, 99):.1f}ms")
+
+    failures = []
+    cache_p99 = percentile(latencies['cache'], 99)
+    if cache_p99 is not None and cache_p99 > CACHE_HIT_LATENCY_TARGET_MS:
+        failures.append(f"cache hit p99 {cache_p99:.1f}ms > target {CACHE_HIT_LATENCY_TARGET_MS}ms")
+    if max(all_values) > (args.timeout + 1) * 1000:
+        failures.append(f"slowest response {max(all_values):.0f}ms exceeded the timeout")
+    if service.stats['fetches'] > len(isbns):
+        failures.append(f"{service.stats['fetches']} live fetches for {len(isbns)} ISBNs (coalescing failed)")
+    if statuses.get('wrong_price'):
+        failures.append(f"{statuses['wrong_price']} responses with a wrong price")
+
+    for failure in failures:
+        logger.error(f"[LOADTEST] ❌ {failure}")
+    if not failures:
+        logger.info("[LOADTEST] ✅ Latency targets met")
+    logger.info("============================================================")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,14 +3,28 @@ Cloud Functions エントリーポイント
 古本買取価格調査システム
 """
 import functions_framework
+from batch_lookup import normalize_isbn
 from book_price_fetcher import ValueBooksScraper
+from buy_completed import move_checked_to_buy_completed
+from price_cache import DEFAULT_PRICE_CACHE_PATH, PriceCache
+from price_lookup import MAX_LOOKUP_ISBNS, PriceLookupService
+from profit_rollup import ProfitRollup
+from profiling import RunProfiler
+from sheets_quota import create_sheets_client
 import os
+import json
 import logging
+import math
+import threading
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# lookup_price: インスタンスの生存中はブラウザとキャッシュを使い回す
+_lookup_service = None
+_lookup_service_lock = threading.Lock()
+
 @functions_framework.http
 def update_prices(request):
     """
@@ -18,6 +32,9 @@ def update_prices(request):
     
     Args:
         request: HTTPリクエスト
+                 ?profile=file     プロファイルを /tmp/profiles に保存
+                 ?profile=response プロファイルをレスポンス(JSON)で返す
+                 （環境変数 PROFILE_UPDATE でも指定可能）
         
     Returns:
         tuple: (メッセージ, ステータスコード)
@@ -36,23 +53,47 @@ def update_prices(request):
     
     logger.info(f"スプレッドシートID: {spreadsheet_id}")
     
+    # プロファイリング（無効時はプロファイラを作成しない）
+    profile_mode = request.args.get('profile') or os.environ.get('PROFILE_UPDATE')
+    profiler = RunProfiler() if profile_mode else None
+    
     scraper = None
     try:
         # スクレイパーを初期化
         logger.info("スクレイパーを初期化中...")
+        # STORAGE_BACKEND=sqlite でローカルSQLiteを正とし、スプレッドシートへ一括同期
         scraper = ValueBooksScraper(
             credentials_file='credentials.json',
-            headless=True
+            headless=True,
+            storage=os.environ.get('STORAGE_BACKEND', 'sheets'),
+            sqlite_path=os.environ.get('SQLITE_PATH'),
+            # 障害調査用: ValueBooksとの通信を圧縮アーカイブに記録
+            record_path=os.environ.get('VALUEBOOKS_RECORD_PATH'),
+            # 価格取得ワーカー数（1ワーカーにつきChromeを1つ起動）
+            fetch_workers=int(os.environ.get('FETCH_WORKERS', '1')),
+            # 比較する買取業者（カンマ区切り、未設定ならValueBooksのみ）
+            buyers=[name for name in os.environ.get('BUYERS', '').split(',') if name.strip()] or None,
+            profiler=profiler,
+            # Chromeプロファイル（HTTPキャッシュ）の保存先。未設定なら毎回新規プロファイル
+            profile_dir=os.environ.get('CHROME_PROFILE_DIR'),
+            cache_size_mb=int(os.environ.get('CHROME_CACHE_SIZE_MB', '200'))
         )
         
         # スプレッドシートを更新
         logger.info("スプレッドシート更新開始...")
-        scraper.update_spreadsheet(spreadsheet_id)
+        if profiler:
+            profiler.run(scraper.update_spreadsheet, spreadsheet_id)
+        else:
+            scraper.update_spreadsheet(spreadsheet_id)
         
         logger.info("=" * 60)
         logger.info("価格更新処理が完了しました")
         logger.info("=" * 60)
         
+        if profile_mode == 'response':
+            body = {'message': 'Success: Prices updated successfully', 'profile': profiler.report()}
+            return json.dumps(body, ensure_ascii=False), 200, {'Content-Type': 'application/json'}
+        
         return 'Success: Prices updated successfully', 200
         
     except Exception as e:
@@ -65,3 +106,189 @@ def update_prices(request):
         if scraper:
             scraper.close()
             logger.info("リソースをクリーンアップしました")
+
+
+@functions_framework.http
+def move_buy_completed(request):
+    """
+    HTTPトリガーでチェック済み書籍を買取完了シートへ一括移行
+    
+    Args:
+        request: HTTPリクエスト（?sheet=買取完了_YYYY-MM-DD で移行先を指定可能）
+        
+    Returns:
+        tuple: (メッセージ, ステータスコード)
+    """
+    spreadsheet_id = os.environ.get('SPREADSHEET_ID')
+    
+    if not spreadsheet_id:
+        error_msg = 'Error: SPREADSHEET_ID environment variable not set'
+        logger.error(error_msg)
+        return error_msg, 500
+    
+    try:
+        client = create_sheets_client('credentials.json')
+        spreadsheet = client.open_by_key(spreadsheet_id)
+        result = move_checked_to_buy_completed(spreadsheet, request.args.get('sheet'))
+        client.governor.log_summary()
+        
+        if result['history_error']:
+            # The books were moved; only the price history still has their rows
+            return (f"Warning: {result['moved']} books moved to {result['sheet']}, "
+                    f"but price history purge failed: {result['history_error']}"), 500
+        
+        return (f"Success: {result['moved']} books moved to {result['sheet']} "
+                f"({result['history_deleted']} history rows deleted)"), 200
+        
+    except Exception as e:
+        error_msg = f'Error: {str(e)}'
+        logger.error(error_msg)
+        logger.exception("詳細なエラー情報:")
+        return error_msg, 500
+
+
+@functions_framework.http
+def update_dashboard(request):
+    """
+    HTTPトリガーで買取実績を集計してダッシュボードに書き込み
+    
+    Args:
+        request: HTTPリクエスト
+        
+    Returns:
+        tuple: (メッセージ, ステータスコード)
+    """
+    spreadsheet_id = os.environ.get('SPREADSHEET_ID')
+    
+    if not spreadsheet_id:
+        error_msg = 'Error: SPREADSHEET_ID environment variable not set'
+        logger.error(error_msg)
+        return error_msg, 500
+    
+    try:
+        client = create_sheets_client('credentials.json')
+        spreadsheet = client.open_by_key(spreadsheet_id)
+        rollup = ProfitRollup()
+        totals = rollup.refresh(spreadsheet)
+        rollup.publish(spreadsheet, totals)
+        client.governor.log_summary()
+        
+        return f"Success: {totals['total_count']} books, total profit {totals['total_profit']}", 200
+        
+    except Exception as e:
+        error_msg = f'Error: {str(e)}'
+        logger.error(error_msg)
+        logger.exception("詳細なエラー情報:")
+        return error_msg, 500
+
+
+def _get_lookup_service():
+    """
+    単発検索サービスを取得（初回のみブラウザを起動）
+    
+    Returns:
+        PriceLookupService: インスタンス内で共有するサービス
+    """
+    global _lookup_service
+    with _lookup_service_lock:
+        if _lookup_service is None:
+            cache = PriceCache(
+                os.environ.get('PRICE_CACHE_PATH', DEFAULT_PRICE_CACHE_PATH),
+                ttl_seconds=float(os.environ.get('LOOKUP_CACHE_TTL_HOURS', '24')) * 3600
+            )
+            profile_dir = os.environ.get('CHROME_PROFILE_DIR')
+            browser_count = [0]
+            
+            def create_scraper():
+                # Chromeはプロファイルをロックするため、ブラウザごとに別ディレクトリ
+                browser_count[0] += 1
+                return ValueBooksScraper(
+                    credentials_file=None,
+                    headless=True,
+                    profile_dir=f"{profile_dir}-lookup-{browser_count[0]}" if profile_dir else None
+                )
+            
+            _lookup_service = PriceLookupService(
+                cache,
+                create_scraper,
+                browsers=int(os.environ.get('LOOKUP_BROWSERS', '1'))
+            )
+            _lookup_service.warm_up()
+        return _lookup_service
+
+
+def _parse_non_negative(value):
+    """
+    クエリパラメータを0以上の数値に変換
+    
+    Args:
+        value: パラメータ値（未指定ならNone）
+        
+    Returns:
+        float: 数値（未指定ならNone）
+        
+    Raises:
+        ValueError: 数値でない、負の値、またはinf/nanの場合
+    """
+    if value is None or value.strip() == '':
+        return None
+    number = float(value)
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f'Invalid number: {value}')
+    return number
+
+
+@functions_framework.http
+def lookup_price(request):
+    """
+    HTTPトリガーで1件〜数件のISBNの買取価格を同期的に返す
+    
+    Args:
+        request: HTTPリクエスト
+                 ?isbn=9784...&isbn=9784... または ?isbn=9784...,9784...
+                 （POSTの場合は JSON {"isbns": [...]} も可）
+                 ?max_age_hours=N  キャッシュの許容経過時間（デフォルト: LOOKUP_CACHE_TTL_HOURS）
+                 ?timeout=N        取得を待つ最大秒数（超えた分は status 'pending'）
+        
+    Returns:
+        tuple: (JSON, ステータスコード, ヘッダー)
+    """
+    headers = {'Content-Type': 'application/json'}
+    
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict) or not isinstance(body.get('isbns', []), list):
+        error = {'error': 'JSONは {"isbns": [...]} の形式で指定してください'}
+        return json.dumps(error, ensure_ascii=False), 400, headers
+    
+    try:
+        max_age_hours = _parse_non_negative(request.args.get('max_age_hours'))
+        timeout = _parse_non_negative(request.args.get('timeout'))
+    except ValueError:
+        error = {'error': 'max_age_hours と timeout には0以上の数値を指定してください'}
+        return json.dumps(error, ensure_ascii=False), 400, headers
+    
+    values = [value for arg in request.args.getlist('isbn') for value in arg.split(',')]
+    values += [str(value) for value in body.get('isbns', [])]
+    values = [value.strip() for value in values if value.strip()]
+    
+    invalid = [value for value in values if normalize_isbn(value) is None]
+    isbns = list(dict.fromkeys(normalize_isbn(value) for value in values if normalize_isbn(value)))
+    if invalid or not isbns or len(isbns) > MAX_LOOKUP_ISBNS:
+        error = {'error': f'1〜{MAX_LOOKUP_ISBNS}件の有効なISBNを指定してください', 'invalid': invalid}
+        return json.dumps(error, ensure_ascii=False), 400, headers
+    
+    try:
+        service = _get_lookup_service()
+        results = service.lookup(
+            isbns,
+            max_age=max_age_hours * 3600 if max_age_hours is not None else None,
+            timeout=timeout
+        )
+        service.log_summary()
+        return json.dumps({'results': results}, ensure_ascii=False), 200, headers
+        
+    except Exception as e:
+        error_msg = f'Error: {str(e)}'
+        logger.error(error_msg)
+        logger.exception("詳細なエラー情報:")
+        return json.dumps({'error': error_msg}, ensure_ascii=False), 500, headers
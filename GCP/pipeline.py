@@ -0,0 +1,176 @@
+"""
+価格更新のパイプライン処理
+
+対象ISBNの投入（producer）→ 価格取得（fetch workers）→ 書き込み（writer）を
+上限付きキューでつなぎ、スクレイピング中にスプレッドシートへの書き込みを並行して行う。
+書き込みは件数または経過時間でまとめて実行する。
+"""
+
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Writer flushes when this many results are buffered...
+WRITE_BATCH_SIZE = 10
+# ...or when the oldest buffered result is this old
+WRITE_FLUSH_INTERVAL_SECONDS = 15.0
+
+_DONE = object()
+
+
+class PricePipeline:
+    """Streaming fetch/write pipeline with bounded queues"""
+
+    def __init__(self, fetchers, writer, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL_SECONDS, queue_size=None):
+        """
+        Initialize
+
+        Args:
+            fetchers: List of callables item -> outcome dict, one per fetch worker
+                      (each worker owns its own browser)
+            writer: Callable receiving a list of outcomes to write in one batch
+            batch_size: Number of outcomes per write batch
+            flush_interval: Maximum seconds an outcome waits in the write buffer
+            queue_size: Capacity of each queue (default: 2 x batch_size)
+        """
+        self.fetchers = fetchers
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size or batch_size * 2
+        self.stats = {
+            'fetched': 0,
+            'batches': 0,
+            'fetch_seconds': 0.0,
+            'write_seconds': 0.0,
+            'wall_seconds': 0.0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def run(self, items):
+        """
+        Run the pipeline until every item has been fetched and written
+
+        Args:
+            items: Iterable of items to process
+
+        Returns:
+            dict: Pipeline statistics
+
+        Raises:
+            Exception: Error raised while iterating items (after fetched items are written)
+        """
+        started = time.monotonic()
+        self._producer_error = None
+        fetch_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+
+        producer = threading.Thread(target=self._produce, args=(items, fetch_queue), name='pipeline-producer', daemon=True)
+        workers = [
+            threading.Thread(target=self._fetch_loop, args=(fetcher, fetch_queue, write_queue),
+                             name=f'pipeline-fetch-{idx}', daemon=True)
+            for idx, fetcher in enumerate(self.fetchers)
+        ]
+        producer.start()
+        for worker in workers:
+            worker.start()
+
+        # The writer runs on the calling thread so storage errors surface here
+        self._write_loop(write_queue, len(workers))
+
+        producer.join()
+        for worker in workers:
+            worker.join()
+
+        self.stats['wall_seconds'] = time.monotonic() - started
+        if self._producer_error is not None:
+            raise self._producer_error
+        return self.stats
+
+    def log_summary(self):
+        """Log how much fetch and write time overlapped"""
+        busy = self.stats['fetch_seconds'] + self.stats['write_seconds']
+        overlap = max(0.0, busy - self.stats['wall_seconds'])
+        logger.info("============================================================")
+        logger.info("PIPELINE STATISTICS")
+        logger.info("============================================================")
+        logger.info(f"Fetch workers: {len(self.fetchers)}")
+        logger.info(f"Fetched: {self.stats['fetched']} items in {self.stats['batches']} write batches")
+        logger.info(f"Fetch time: {self.stats['fetch_seconds']:.1f}s, write time: {self.stats['write_seconds']:.1f}s")
+        logger.info(f"Wall time: {self.stats['wall_seconds']:.1f}s (overlapped: {overlap:.1f}s)")
+        logger.info("============================================================")
+
+    def _produce(self, items, fetch_queue):
+        try:
+            for item in items:
+                fetch_queue.put(item)  # Blocks while fetch workers are busy
+        except Exception as e:
+            # Re-raised from run() once the items already queued are written
+            logger.error(f"[PIPELINE] ❌ Failed to read items: {e}")
+            self._producer_error = e
+        finally:
+            for _ in self.fetchers:
+                fetch_queue.put(_DONE)
+
+    def _fetch_loop(self, fetcher, fetch_queue, write_queue):
+        while True:
+            item = fetch_queue.get()
+            if item is _DONE:
+                write_queue.put(_DONE)
+                return
+
+            fetch_started = time.monotonic()
+            try:
+                outcome = fetcher(item)
+            except Exception as e:
+                logger.error(f"[PIPELINE] ❌ Fetch worker error for ISBN {item.get('isbn')}: {e}", exc_info=True)
+                outcome = {'item': item, 'result': None, 'error_type': 'UNKNOWN_ERROR', 'error': str(e)}
+
+            with self._stats_lock:
+                self.stats['fetched'] += 1
+                self.stats['fetch_seconds'] += time.monotonic() - fetch_started
+            write_queue.put(outcome)  # Blocks while the writer is behind
+
+    def _write_loop(self, write_queue, worker_count):
+        buffer = []
+        buffer_started = None
+        remaining_workers = worker_count
+
+        while remaining_workers > 0:
+            timeout = None
+            if buffer:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - buffer_started))
+            try:
+                outcome = write_queue.get(timeout=timeout)
+            except queue.Empty:
+                outcome = None
+
+            if outcome is _DONE:
+                remaining_workers -= 1
+            elif outcome is not None:
+                if not buffer:
+                    buffer_started = time.monotonic()
+                buffer.append(outcome)
+
+            if buffer and (len(buffer) >= self.batch_size or outcome is None
+                           or time.monotonic() - buffer_started >= self.flush_interval):
+                self._flush(buffer)
+                buffer = []
+
+        if buffer:
+            self._flush(buffer)
+
+    def _flush(self, buffer):
+        write_started = time.monotonic()
+        logger.info(f"[PIPELINE] Writing batch of {len(buffer)} results...")
+        try:
+            self.writer(buffer)
+        except Exception as e:
+            # Keep draining the queue so fetch workers never block on a dead writer
+            logger.error(f"[PIPELINE] ❌ Write batch error: {e}", exc_info=True)
+        self.stats['batches'] += 1
+        self.stats['write_seconds'] += time.monotonic() - write_started
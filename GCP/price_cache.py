@@ -0,0 +1,98 @@
+"""
+買取価格のローカルキャッシュ
+
+ISBNごとの取得結果をSQLiteに保存し、有効期限（TTL）内であればスクレイピングせずに返す。
+バッチCLI（batch_lookup.py）や単発検索で、同じISBNを何度もValueBooksに問い合わせないために使う。
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICE_CACHE_PATH = '/tmp/price_cache.db'
+# Purchase prices change at most daily
+DEFAULT_PRICE_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+class PriceCache:
+    """SQLite-backed cache of lookup results with a TTL"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prices (
+            isbn TEXT PRIMARY KEY,
+            book_info TEXT,
+            fetched_at REAL
+        );
+    """
+
+    def __init__(self, db_path=DEFAULT_PRICE_CACHE_PATH, ttl_seconds=DEFAULT_PRICE_CACHE_TTL_SECONDS):
+        """
+        Initialize
+
+        Args:
+            db_path: SQLite database file path
+            ttl_seconds: Seconds an entry stays fresh
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, isbn, max_age=None):
+        """
+        Get a fresh cached result
+
+        Args:
+            isbn: ISBN
+            max_age: Maximum entry age in seconds (default: ttl_seconds)
+
+        Returns:
+            dict: Book information with 'cached_at' (None if missing or stale)
+        """
+        max_age = self.ttl_seconds if max_age is None else max_age
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT book_info, fetched_at FROM prices WHERE isbn = ?", (isbn,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > max_age:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+
+        book_info = json.loads(row[0])
+        book_info['cached_at'] = row[1]
+        return book_info
+
+    def put(self, book_info):
+        """
+        Store a lookup result
+
+        Args:
+            book_info: Book information from search_isbn_estimate
+        """
+        book_info = {key: value for key, value in book_info.items() if key != 'cached_at'}
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO prices (isbn, book_info, fetched_at) VALUES (?, ?, ?)",
+                (book_info['isbn'], json.dumps(book_info, ensure_ascii=False), time.time())
+            )
+            self.conn.commit()
+
+    def log_summary(self):
+        """Log hit/miss counts"""
+        total = self.stats['hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] / total * 100) if total else 0
+        logger.info(f"[CACHE] Price cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                    f"({hit_rate:.1f}% hit rate)")
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,239 @@
+"""
+単発ISBN検索（低レイテンシ）
+
+1件〜数件のISBNの買取価格を同期的に返す（main.lookup_price から使用）。
+- 価格キャッシュ（price_cache.py）に有効期限内の結果があればスクレイピングせずに返す
+- なければ起動済みのブラウザ（インスタンスの生存中は使い回す）で取得する
+- 同じISBNへの同時リクエストは1回の取得にまとめる（request coalescing）
+- 応答時間の上限（timeout）を超えた場合は status 'pending' を返し、取得はバックグラウンドで続けて
+  結果をキャッシュに入れる（次のリクエストでキャッシュから返る）
+
+レイテンシ目標（load_test_lookup.py で計測）:
+- キャッシュヒット: p99 100ms 以下
+- キャッシュミス: 応答は LOOKUP_TIMEOUT_SECONDS 以内（取得そのものは1件10秒前後）
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from retry_queue import DRIVER_ERROR_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# Maximum time a request waits for a live fetch before answering 'pending'
+LOOKUP_TIMEOUT_SECONDS = 25.0
+# p99 latency target of cache hits
+CACHE_HIT_LATENCY_TARGET_MS = 100
+# Maximum ISBNs per request
+MAX_LOOKUP_ISBNS = 10
+
+
+class PriceLookupService:
+    """Answers price lookups from the cache or a pool of kept-warm browsers"""
+
+    def __init__(self, cache, scraper_factory, browsers=1, timeout=LOOKUP_TIMEOUT_SECONDS):
+        """
+        Initialize
+
+        Args:
+            cache: PriceCache
+            scraper_factory: Callable returning a ValueBooksScraper (called lazily, once per browser)
+            browsers: Number of browsers (concurrent live fetches)
+            timeout: Maximum seconds a request waits for a live fetch
+        """
+        self.cache = cache
+        self.scraper_factory = scraper_factory
+        self.browsers = max(1, browsers)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.browsers, thread_name_prefix='lookup-fetch')
+        self._idle_scrapers = queue.Queue()
+        self._scrapers = []
+        self._scrapers_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'cache_hits': 0, 'fetches': 0, 'coalesced': 0, 'pending': 0, 'errors': 0}
+
+    def warm_up(self):
+        """Start every browser and load the estimate page once (fills the HTTP cache)"""
+        scrapers = [self._acquire_scraper() for _ in range(self.browsers)]
+        for scraper in scrapers:
+            try:
+                scraper.driver.get(scraper.estimate_url)
+            except Exception as e:
+                logger.warning(f"[LOOKUP] ⚠️ Warm-up page load failed: {e}")
+            self._idle_scrapers.put(scraper)
+        logger.info(f"[LOOKUP] ✅ {len(scrapers)} browsers warm")
+
+    def lookup(self, isbns, max_age=None, timeout=None):
+        """
+        Look up several ISBNs concurrently
+
+        Args:
+            isbns: Normalized ISBNs
+            max_age: Maximum cache entry age in seconds (default: cache TTL)
+            timeout: Maximum seconds to wait for live fetches (default: self.timeout)
+
+        Returns:
+            list: Result per ISBN, in request order
+        """
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        entries = [(isbn, self._resolve(isbn, max_age, started)) for isbn in isbns]
+        return [self._wait(isbn, resolved, started, deadline) for isbn, resolved in entries]
+
+    def log_summary(self):
+        """Log lookup statistics"""
+        logger.info(f"[LOOKUP] Stats: {self.stats}")
+
+    def close(self):
+        """Stop fetch workers and close browsers"""
+        self._executor.shutdown(wait=True)
+        for scraper in self._scrapers:
+            scraper.close()
+        self._scrapers = []
+
+    def _resolve(self, isbn, max_age, started):
+        """
+        Answer from the cache, or join/start the live fetch of the ISBN
+
+        Returns:
+            tuple: (result dict, None) for cache hits, (None, Future) otherwise
+        """
+        cached = self.cache.get(isbn, max_age)
+        if cached:
+            self._count('cache_hits')
+            return _result(isbn, 'ok', 'cache', started, cached), None
+
+        with self._inflight_lock:
+            future = self._inflight.get(isbn)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[isbn] = future
+        if leader:
+            self._executor.submit(self._fetch, isbn, future)
+        else:
+            self._count('coalesced')
+        return None, future
+
+    def _wait(self, isbn, resolved, started, deadline):
+        result, future = resolved
+        if result:
+            return result
+        try:
+            outcome = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            self._count('pending')
+            return _result(isbn, 'pending', 'live', started, None)
+
+        if outcome['result']:
+            return _result(isbn, 'ok', 'live', started, outcome['result'])
+        error = _result(isbn, 'error', 'live', started, None)
+        error.update({'error_type': outcome['error_type'], 'error': outcome['error']})
+        return error
+
+    def _fetch(self, isbn, future):
+        """Fetch one ISBN on an idle browser (runs on a fetch worker)"""
+        try:
+            # A previous fetch may have filled the cache after the caller checked it
+            cached = self.cache.get(isbn)
+            if cached:
+                future.set_result({'result': cached, 'error_type': None, 'error': None})
+                return
+
+            scraper = self._acquire_scraper()
+            usable = True
+            try:
+                self._count('fetches')
+                outcome = scraper._fetch_price({'isbn': isbn, 'row': None})
+                if outcome['result']:
+                    self.cache.put(outcome['result'])
+                else:
+                    self._count('errors')
+                    if outcome['error_type'] in DRIVER_ERROR_CLASSES:
+                        usable = self._restart_scraper(scraper)
+            finally:
+                # None frees the pool slot of a discarded browser (wakes a waiting _acquire_scraper)
+                self._idle_scrapers.put(scraper if usable else None)
+            future.set_result(outcome)
+        except Exception as e:
+            logger.error(f"[LOOKUP] ❌ Fetch error for ISBN {isbn}: {e}", exc_info=True)
+            self._count('errors')
+            future.set_result({'result': None, 'error_type': 'UNKNOWN_ERROR', 'error': str(e)})
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(isbn, None)
+
+    def _acquire_scraper(self):
+        """Take an idle browser, starting a new one while below the pool size"""
+        while True:
+            try:
+                scraper = self._idle_scrapers.get_nowait()
+            except queue.Empty:
+                with self._scrapers_lock:
+                    if len(self._scrapers) < self.browsers:
+                        logger.info(f"[LOOKUP] Starting browser {len(self._scrapers) + 1}/{self.browsers}...")
+                        scraper = self.scraper_factory()
+                        self._scrapers.append(scraper)
+                        return scraper
+                scraper = self._idle_scrapers.get()
+            if scraper is not None:
+                return scraper
+            # A broken browser was discarded: its slot is free again
+
+    def _restart_scraper(self, scraper):
+        """
+        Restart the browser of a scraper after a driver-level failure
+
+        Args:
+            scraper: ValueBooksScraper whose browser failed
+
+        Returns:
+            bool: True if it can be reused, False if it was discarded (restart failed)
+        """
+        logger.warning("[LOOKUP] ⚠️ Browser failed, restarting it...")
+        try:
+            scraper._recycle_driver()
+            return True
+        except Exception as e:
+            logger.error(f"[LOOKUP] ❌ Browser restart failed, discarding it: {e}", exc_info=True)
+        with self._scrapers_lock:
+            if scraper in self._scrapers:
+                self._scrapers.remove(scraper)
+        try:
+            scraper.close()
+        except Exception as e:
+            logger.warning(f"[LOOKUP] ⚠️ Error while closing discarded browser: {e}")
+        return False
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+
+def _result(isbn, status, source, started, book_info):
+    """
+    Build a lookup result
+
+    Args:
+        isbn: ISBN
+        status: 'ok', 'pending' or 'error'
+        source: 'cache' or 'live'
+        started: time.monotonic() when the request started
+        book_info: Book information (None unless status is 'ok')
+
+    Returns:
+        dict: {isbn, status, source, elapsed_ms, price, title, author, publisher, price_date, ...}
+    """
+    result = {'isbn': isbn, 'status': status, 'source': source,
+              'elapsed_ms': round((time.monotonic() - started) * 1000, 1)}
+    if book_info:
+        for key in ('price', 'title', 'author', 'publisher', 'price_date', 'buyer', 'offers', 'cached_at'):
+            if key in book_info:
+                result[key] = book_info[key]
+    return result
@@ -0,0 +1,191 @@
+"""
+価格更新処理のプロファイリング
+
+update_spreadsheet をcProfileで計測し、tracemallocでメモリ確保箇所を記録する。
+- プロファイル: pstats形式（.prof）。snakeviz などの既存ビューアで開ける
+- メモリ: 開始時・シート読み込み後・N件処理ごとのスナップショットの上位確保箇所（テキスト）
+
+フラグが無効なときはプロファイラを作成しないため、オーバーヘッドはない。
+"""
+
+import base64
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PROFILE_OUTPUT_DIR = '/tmp/profiles'
+# Take a tracemalloc snapshot after every N ISBNs
+PROFILE_SNAPSHOT_EVERY = 5
+PROFILE_TOP_ALLOCATIONS = 25
+
+
+class RunProfiler:
+    """cProfile + tracemalloc profiler for one update run"""
+
+    def __init__(self, output_dir=PROFILE_OUTPUT_DIR, snapshot_every=PROFILE_SNAPSHOT_EVERY,
+                 top_allocations=PROFILE_TOP_ALLOCATIONS):
+        """
+        Initialize
+
+        Args:
+            output_dir: Directory for .prof and allocation report files
+            snapshot_every: Take a memory snapshot after every N ISBNs
+            top_allocations: Number of allocation sites per snapshot
+        """
+        self.output_dir = output_dir
+        self.snapshot_every = snapshot_every
+        self.top_allocations = top_allocations
+        self._profiles = []
+        self._thread_local = threading.local()
+        self._snapshots = []
+        self._isbn_count = 0
+        self._lock = threading.Lock()
+        self.profile_path = None
+        self.allocation_path = None
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run func under the profiler and write the reports
+
+        Args:
+            func: Callable to profile (e.g. scraper.update_spreadsheet)
+
+        Returns:
+            Return value of func
+        """
+        tracemalloc.start()
+        self.checkpoint('start')
+        try:
+            return self._call_profiled(func, *args, **kwargs)
+        finally:
+            self.checkpoint('end')
+            tracemalloc.stop()
+            self._write_reports()
+
+    def wrap(self, func):
+        """
+        Profile calls of func on whichever thread runs it (cProfile is per thread)
+
+        Args:
+            func: Callable run on a worker thread
+
+        Returns:
+            callable: Wrapped callable
+        """
+        def profiled(*args, **kwargs):
+            return self._call_profiled(func, *args, **kwargs)
+        return profiled
+
+    def checkpoint(self, label):
+        """
+        Take a tracemalloc snapshot
+
+        Args:
+            label: Snapshot label
+        """
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            self._snapshots.append((label, snapshot, current, peak))
+        logger.info(f"[PROFILE] Snapshot '{label}': current {current / 1024 / 1024:.1f}MB, peak {peak / 1024 / 1024:.1f}MB")
+
+    def isbn_done(self):
+        """Count a processed ISBN and take a snapshot every snapshot_every ISBNs"""
+        with self._lock:
+            self._isbn_count += 1
+            count = self._isbn_count
+        if count % self.snapshot_every == 0:
+            self.checkpoint(f'after_{count}_isbns')
+
+    def report(self):
+        """
+        Build a report for the HTTP response
+
+        Returns:
+            dict: {profile_file, allocation_file, profile_pstats_base64, top_functions, allocations}
+        """
+        with open(self.profile_path, 'rb') as f:
+            profile_data = f.read()
+        with open(self.allocation_path, encoding='utf-8') as f:
+            allocations = f.read()
+        return {
+            'profile_file': self.profile_path,
+            'allocation_file': self.allocation_path,
+            'profile_pstats_base64': base64.b64encode(profile_data).decode('ascii'),
+            'top_functions': self._top_functions(),
+            'allocations': allocations,
+        }
+
+    def _call_profiled(self, func, *args, **kwargs):
+        profile = getattr(self._thread_local, 'profile', None)
+        if profile is None:
+            profile = cProfile.Profile()
+            self._thread_local.profile = profile
+            with self._lock:
+                self._profiles.append(profile)
+
+        # Nested call on the same thread is already being profiled
+        if getattr(self._thread_local, 'active', False):
+            return func(*args, **kwargs)
+
+        self._thread_local.active = True
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._thread_local.active = False
+
+    def _stats(self):
+        stats = None
+        for profile in self._profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+    def _top_functions(self, limit=30):
+        stream = io.StringIO()
+        stats = self._stats()
+        if stats:
+            stats.stream = stream
+            stats.sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def _write_reports(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        self.profile_path = os.path.join(self.output_dir, f'update_{stamp}.prof')
+        self.allocation_path = os.path.join(self.output_dir, f'update_{stamp}_alloc.txt')
+
+        stats = self._stats()
+        if stats:
+            stats.dump_stats(self.profile_path)
+
+        baseline = self._snapshots[0][1] if self._snapshots else None
+        with open(self.allocation_path, 'w', encoding='utf-8') as f:
+            for label, snapshot, current, peak in self._snapshots:
+                f.write(f"=== {label}: current {current / 1024 / 1024:.1f}MB, peak {peak / 1024 / 1024:.1f}MB ===\n")
+                f.write("-- Top allocation sites --\n")
+                for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                    f.write(f"{stat}\n")
+                if baseline is not None and snapshot is not baseline:
+                    f.write("-- Growth since start --\n")
+                    for stat in snapshot.compare_to(baseline, 'lineno')[:self.top_allocations]:
+                        f.write(f"{stat}\n")
+                f.write("\n")
+
+        logger.info(f"[PROFILE] ✅ Profile written: {self.profile_path}")
+        logger.info(f"[PROFILE] ✅ Allocation report written: {self.allocation_path}")
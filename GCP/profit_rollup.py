@@ -0,0 +1,230 @@
+"""
+買取実績（利益）の集計
+
+全「買取完了_*」シートのG列（利益）から、総冊数・総利益・最高利益・月別実績・
+高利益TOP10を集計してダッシュボードに書き込む。
+シートごとの集計結果をキャッシュし、行数が変わったシート（および売却価格の入力が
+続く直近のシート）だけを読み直す。
+
+ダッシュボードの書き込み先:
+- B14: 総買取冊数, B15: 総利益, B17: 最高利益
+- B20: 今月買取冊数, B21: 今月利益
+- F32:I41: 高利益TOP10（タイトル, 見積価格, 売却価格, 利益）
+- B25: 最終更新
+（B16, B22 の平均はシート上の数式のまま）
+"""
+
+import heapq
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+BUY_COMPLETED_PREFIX = '買取完了_'
+DASHBOARD_SHEET = 'ダッシュボード'
+
+ROLLUP_CACHE_PATH = '/tmp/profit_rollup.json'
+TOP_PROFIT_COUNT = 10
+# Sale prices (F列) are entered after the move, so recent sheets are always re-read
+RECENT_SHEET_DAYS = 31
+
+
+class ProfitRollup:
+    """Incremental per-sheet aggregates of purchase profits"""
+
+    def __init__(self, cache_path=ROLLUP_CACHE_PATH, top_n=TOP_PROFIT_COUNT, recent_days=RECENT_SHEET_DAYS):
+        """
+        Initialize
+
+        Args:
+            cache_path: JSON file holding per-sheet aggregates
+            top_n: Number of top profit books to keep
+            recent_days: Sheets dated within this many days are always re-read
+        """
+        self.cache_path = cache_path
+        self.top_n = top_n
+        self.recent_days = recent_days
+        self.cache = self._load_cache()
+
+    def refresh(self, spreadsheet):
+        """
+        Update per-sheet aggregates and compute totals
+
+        Args:
+            spreadsheet: gspread Spreadsheet
+
+        Returns:
+            dict: Totals {total_count, total_profit, max_profit, monthly, this_month, top}
+        """
+        jst_now = datetime.now(pytz.timezone('Asia/Tokyo'))
+        recent_since = (jst_now - timedelta(days=self.recent_days)).strftime('%Y-%m-%d')
+
+        buy_sheets = [sheet for sheet in spreadsheet.worksheets() if sheet.title.startswith(BUY_COMPLETED_PREFIX)]
+
+        # Row counts of every purchase sheet in one request
+        row_counts = {}
+        if buy_sheets:
+            response = spreadsheet.values_batch_get([f"'{sheet.title}'!A2:A" for sheet in buy_sheets])
+            for sheet, value_range in zip(buy_sheets, response.get('valueRanges', [])):
+                row_counts[sheet.id] = len(value_range.get('values', []))
+
+        stale = []
+        for sheet in buy_sheets:
+            entry = self.cache.get(str(sheet.id))
+            sheet_date = sheet.title[len(BUY_COMPLETED_PREFIX):]
+            if (entry is None or entry['rows'] != row_counts[sheet.id] or entry['title'] != sheet.title
+                    or sheet_date >= recent_since):
+                stale.append(sheet)
+
+        logger.info(f"[ROLLUP] Purchase sheets: {len(buy_sheets)}, re-reading: {len(stale)}")
+
+        # Re-read only new or changed sheets, in one request
+        stale = [sheet for sheet in stale if row_counts[sheet.id] > 0]
+        if stale:
+            response = spreadsheet.values_batch_get(
+                [f"'{sheet.title}'!A2:G{row_counts[sheet.id] + 1}" for sheet in stale],
+                params={'valueRenderOption': 'UNFORMATTED_VALUE'}
+            )
+            for sheet, value_range in zip(stale, response.get('valueRanges', [])):
+                self.cache[str(sheet.id)] = self._aggregate_sheet(sheet, row_counts[sheet.id], value_range.get('values', []))
+
+        for sheet in buy_sheets:
+            if row_counts[sheet.id] == 0:
+                self.cache[str(sheet.id)] = self._aggregate_sheet(sheet, 0, [])
+
+        # Forget deleted sheets
+        sheet_ids = {str(sheet.id) for sheet in buy_sheets}
+        self.cache = {sheet_id: entry for sheet_id, entry in self.cache.items() if sheet_id in sheet_ids}
+        self._save_cache()
+
+        return self._totals(jst_now.strftime('%Y-%m'))
+
+    def publish(self, spreadsheet, totals):
+        """
+        Write totals to the dashboard in one request
+
+        Args:
+            spreadsheet: gspread Spreadsheet
+            totals: Totals from refresh()
+        """
+        top_rows = [[book['title'], book['estimate_price'], book['sale_price'], book['profit']] for book in totals['top']]
+        top_rows += [['', '', '', '']] * (self.top_n - len(top_rows))
+
+        dashboard = spreadsheet.worksheet(DASHBOARD_SHEET)
+        dashboard.batch_update([
+            {'range': 'B14:B15', 'values': [[totals['total_count']], [totals['total_profit']]]},
+            {'range': 'B17', 'values': [[totals['max_profit']]]},
+            {'range': 'B20:B21', 'values': [[totals['this_month']['count']], [totals['this_month']['profit']]]},
+            {'range': f'F32:I{31 + self.top_n}', 'values': top_rows},
+            {'range': 'B25', 'values': [[datetime.now(pytz.timezone('Asia/Tokyo')).strftime('%Y/%m/%d %H:%M:%S')]]},
+        ], value_input_option='USER_ENTERED')
+        logger.info(f"[ROLLUP] ✅ Dashboard updated: {totals['total_count']} books, profit {totals['total_profit']}円")
+
+    def _aggregate_sheet(self, sheet, row_count, rows):
+        """
+        Aggregate one purchase sheet
+
+        Args:
+            sheet: gspread Worksheet
+            row_count: Data row count (cache key)
+            rows: Values of A:G
+
+        Returns:
+            dict: Per-sheet aggregate
+        """
+        profit_sum = 0.0
+        profit_max = 0.0
+        books = []
+        for row in rows:
+            row = list(row) + [''] * (7 - len(row))
+            profit = _to_number(row[6])
+            if profit is None:
+                continue
+            profit_sum += profit
+            profit_max = max(profit_max, profit)
+            if row[1] and profit > 0:
+                books.append({
+                    'title': row[1],
+                    'estimate_price': _to_number(row[4]) or 0,
+                    'sale_price': _to_number(row[5]) or 0,
+                    'profit': profit
+                })
+
+        return {
+            'title': sheet.title,
+            'rows': row_count,
+            'month': sheet.title[len(BUY_COMPLETED_PREFIX):][:7],
+            'count': row_count,
+            'profit_sum': profit_sum,
+            'profit_max': profit_max,
+            'top': heapq.nlargest(self.top_n, books, key=lambda book: book['profit']),
+        }
+
+    def _totals(self, this_month):
+        """
+        Combine per-sheet aggregates
+
+        Args:
+            this_month: Current month (YYYY-MM)
+
+        Returns:
+            dict: Totals
+        """
+        monthly = {}
+        for entry in self.cache.values():
+            bucket = monthly.setdefault(entry['month'], {'count': 0, 'profit': 0.0})
+            bucket['count'] += entry['count']
+            bucket['profit'] += entry['profit_sum']
+
+        for bucket in monthly.values():
+            bucket['profit'] = round(bucket['profit'])
+
+        entries = list(self.cache.values())
+        return {
+            'total_count': sum(entry['count'] for entry in entries),
+            'total_profit': round(sum(entry['profit_sum'] for entry in entries)),
+            'max_profit': round(max([entry['profit_max'] for entry in entries], default=0)),
+            'monthly': monthly,
+            'this_month': monthly.get(this_month, {'count': 0, 'profit': 0}),
+            'top': heapq.nlargest(self.top_n, (book for entry in entries for book in entry['top']),
+                                  key=lambda book: book['profit']),
+        }
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[ROLLUP] ⚠️ Failed to load cache, rebuilding: {e}")
+            return {}
+
+    def _save_cache(self):
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"[ROLLUP] ⚠️ Failed to save cache: {e}")
+
+
+def _to_number(value):
+    """
+    Convert a cell value to float
+
+    Args:
+        value: Cell value
+
+    Returns:
+        float: Converted value (None if empty or not a number)
+    """
+    if value == '' or value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
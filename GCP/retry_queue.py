@@ -0,0 +1,222 @@
+"""
+価格取得に失敗したISBNの再試行キュー（デッドレターキュー）
+
+失敗したISBNをエラー種別・試行回数・最終エラーとともに記録し、ストレージバックエンド
+（再試行キューシート / SQLite）に保存する。
+- 同じ実行の最後に、ブラウザを起動し直して再試行する（エラー種別ごとのポリシー）
+- 次回の実行では優先的に処理する
+- 試行回数の上限に達したISBNは隔離（quarantined）し、通常の処理対象から外す
+  （再試行キューシートの状態を pending に戻すか行を削除すると再開）
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_QUARANTINED = 'quarantined'
+
+# Header of the retry queue sheet (same order as FailureRecord.to_row)
+RETRY_QUEUE_HEADER = ['ISBN', 'エラー種別', '試行回数', '最終エラー', '初回失敗日時', '最終失敗日時', '状態']
+
+# Maximum length of the stored error message
+MAX_ERROR_LENGTH = 500
+
+
+class RetryPolicy:
+    """Retry policy of one error class"""
+
+    def __init__(self, retry_in_run, recycle_driver, delay_seconds, max_attempts):
+        """
+        Initialize
+
+        Args:
+            retry_in_run: Retry at the end of the same run
+            recycle_driver: Restart the browser before the end-of-run retry
+            delay_seconds: Wait before the end-of-run retry
+            max_attempts: Attempts (across runs) before the ISBN is quarantined
+        """
+        self.retry_in_run = retry_in_run
+        self.recycle_driver = recycle_driver
+        self.delay_seconds = delay_seconds
+        self.max_attempts = max_attempts
+
+
+# Error class (from ValueBooksScraper._fetch_price) -> policy
+RETRY_POLICIES = {
+    # Browser crashed or session lost: a fresh browser usually fixes it
+    'SELENIUM_ERROR': RetryPolicy(retry_in_run=True, recycle_driver=True, delay_seconds=0, max_attempts=6),
+    'MEMORY_ERROR': RetryPolicy(retry_in_run=True, recycle_driver=True, delay_seconds=0, max_attempts=6),
+    # Site slow or unreachable: wait a little, the browser itself is fine
+    'TIMEOUT_ERROR': RetryPolicy(retry_in_run=True, recycle_driver=False, delay_seconds=5, max_attempts=6),
+    'NETWORK_ERROR': RetryPolicy(retry_in_run=True, recycle_driver=False, delay_seconds=15, max_attempts=6),
+    # Page loaded but no search form or price could be read (layout change, odd result page);
+    # browser, timeout and network failures have their own classes above
+    'LOOKUP_FAILED': RetryPolicy(retry_in_run=True, recycle_driver=True, delay_seconds=0, max_attempts=3),
+    'UNKNOWN_ERROR': RetryPolicy(retry_in_run=False, recycle_driver=False, delay_seconds=0, max_attempts=3),
+    # Price fetched but the store write failed: next run, never quarantine for long
+    'WRITE_ERROR': RetryPolicy(retry_in_run=False, recycle_driver=False, delay_seconds=0, max_attempts=20),
+}
+
+DEFAULT_RETRY_POLICY = RETRY_POLICIES['UNKNOWN_ERROR']
+
+# Error classes meaning the browser itself is broken (restart it before the next lookup)
+DRIVER_ERROR_CLASSES = ('SELENIUM_ERROR', 'MEMORY_ERROR')
+
+
+def get_retry_policy(error_class):
+    """
+    Get the retry policy of an error class
+
+    Args:
+        error_class: Error class
+
+    Returns:
+        RetryPolicy: Policy (UNKNOWN_ERROR policy for unknown classes)
+    """
+    return RETRY_POLICIES.get(error_class, DEFAULT_RETRY_POLICY)
+
+
+class FailureRecord:
+    """Failure of one ISBN"""
+
+    def __init__(self, isbn, error_class, attempts=0, last_error='', first_failed_at='', last_failed_at='',
+                 status=STATUS_PENDING):
+        """
+        Initialize
+
+        Args:
+            isbn: ISBN
+            error_class: Error class of the last failure
+            attempts: Number of failed attempts
+            last_error: Last error message
+            first_failed_at: Datetime of the first failure
+            last_failed_at: Datetime of the last failure
+            status: 'pending' or 'quarantined'
+        """
+        self.isbn = isbn
+        self.error_class = error_class
+        self.attempts = attempts
+        self.last_error = last_error
+        self.first_failed_at = first_failed_at
+        self.last_failed_at = last_failed_at
+        self.status = status
+
+    @property
+    def quarantined(self):
+        return self.status == STATUS_QUARANTINED
+
+    def to_row(self):
+        """
+        Returns:
+            list: Row in RETRY_QUEUE_HEADER order
+        """
+        return [self.isbn, self.error_class, self.attempts, self.last_error,
+                self.first_failed_at, self.last_failed_at, self.status]
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Create from a row in RETRY_QUEUE_HEADER order
+
+        Args:
+            row: Row values
+
+        Returns:
+            FailureRecord: Record (None for rows without ISBN)
+        """
+        row = list(row) + [''] * (len(RETRY_QUEUE_HEADER) - len(row))
+        isbn = str(row[0]).strip()
+        if not isbn:
+            return None
+        try:
+            attempts = int(row[2])
+        except (ValueError, TypeError):
+            attempts = 0
+        status = STATUS_QUARANTINED if str(row[6]).strip() == STATUS_QUARANTINED else STATUS_PENDING
+        return cls(isbn, str(row[1]) or 'UNKNOWN_ERROR', attempts, str(row[3]), str(row[4]), str(row[5]), status)
+
+
+class RetryQueue:
+    """Failure records keyed by ISBN"""
+
+    def __init__(self, records=None):
+        """
+        Initialize
+
+        Args:
+            records: FailureRecords loaded from the store
+        """
+        self.records = {record.isbn: record for record in records or []}
+        self.changed = False
+
+    def pending_isbns(self):
+        """
+        Returns:
+            list: ISBNs to process first, oldest failure first
+        """
+        pending = [record for record in self.records.values() if not record.quarantined]
+        return [record.isbn for record in sorted(pending, key=lambda record: record.first_failed_at)]
+
+    def quarantined_isbns(self):
+        """
+        Returns:
+            list: ISBNs excluded from processing
+        """
+        return [record.isbn for record in self.records.values() if record.quarantined]
+
+    def record_failure(self, isbn, error_class, error, failed_at):
+        """
+        Record a failed attempt, quarantining the ISBN when its policy's limit is reached
+
+        Args:
+            isbn: ISBN
+            error_class: Error class
+            error: Error message
+            failed_at: Failure datetime string
+
+        Returns:
+            FailureRecord: Updated record
+        """
+        record = self.records.get(isbn)
+        if record is None:
+            record = FailureRecord(isbn, error_class, first_failed_at=failed_at)
+            self.records[isbn] = record
+
+        record.error_class = error_class
+        record.attempts += 1
+        record.last_error = (error or '')[:MAX_ERROR_LENGTH]
+        record.last_failed_at = failed_at
+        if record.attempts >= get_retry_policy(error_class).max_attempts:
+            record.status = STATUS_QUARANTINED
+            logger.warning(f"[RETRY] 🚫 ISBN {isbn} quarantined after {record.attempts} attempts ({error_class})")
+        self.changed = True
+        return record
+
+    def record_success(self, isbn):
+        """
+        Remove an ISBN that was fetched successfully
+
+        Args:
+            isbn: ISBN
+        """
+        if self.records.pop(isbn, None) is not None:
+            logger.info(f"[RETRY] ✅ ISBN {isbn} recovered, removed from retry queue")
+            self.changed = True
+
+    def rows(self):
+        """
+        Returns:
+            list: Rows in RETRY_QUEUE_HEADER order (pending first)
+        """
+        records = sorted(self.records.values(), key=lambda record: (record.quarantined, record.first_failed_at))
+        return [record.to_row() for record in records]
+
+    def log_summary(self):
+        """Log queue contents"""
+        quarantined = self.quarantined_isbns()
+        logger.info(f"[RETRY] Retry queue: {len(self.records) - len(quarantined)} pending, "
+                    f"{len(quarantined)} quarantined")
+        for record in self.records.values():
+            logger.info(f"  ISBN {record.isbn}: {record.error_class}, {record.attempts} attempts, "
+                        f"{record.status} - {record.last_error[:100]}")
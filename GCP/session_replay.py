@@ -0,0 +1,368 @@
+"""
+ValueBooksセッションの記録・再生
+
+記録モード: ISBN検索中にブラウザが受信した全レスポンスと各ステップのページ(DOM)を
+圧縮アーカイブ(zip)に保存する。
+再生モード: アーカイブをローカルHTTPサーバーから配信し、ネットワークに接続せずに
+search_isbn_estimate / _extract_estimate_result を実行する。
+
+使い方（記録済みアーカイブで回帰テスト）:
+    python session_replay.py recordings/session.zip
+"""
+
+import argparse
+import base64
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+REPLAY_PREFIX = '/__replay__'
+
+# Chrome arguments that make the replay browser unable to reach anything but the local server
+REPLAY_CHROME_ARGUMENTS = [
+    '--host-resolver-rules=MAP * ~NOTFOUND , EXCLUDE 127.0.0.1 , EXCLUDE localhost',
+]
+
+# Emulates the search form submit on the static snapshot of the guide page
+REPLAY_SEARCH_SCRIPT = """<script>
+document.addEventListener('keydown', function (e) {
+  if (e.key === 'Enter' && e.target.tagName === 'INPUT') {
+    location.href = '%s/result?isbn=' + encodeURIComponent(e.target.value);
+  }
+}, true);
+</script>""" % REPLAY_PREFIX
+
+
+class SessionRecorder:
+    """Captures pages and responses of ISBN lookups into a zip archive"""
+
+    def __init__(self, archive_path):
+        """
+        Initialize
+
+        Args:
+            archive_path: Output archive path (.zip)
+        """
+        self.archive_path = archive_path
+        self._archive = zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._index = []
+        self._lookup = None
+        logger.info(f"[RECORD] Recording ValueBooks session to: {archive_path}")
+
+    @staticmethod
+    def configure_options(options):
+        """
+        Enable Chrome performance logging (network events) on driver options
+
+        Args:
+            options: selenium.webdriver.chrome.options.Options
+        """
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    def start(self, driver, isbn):
+        """
+        Start recording a lookup
+
+        Args:
+            driver: WebDriver
+            isbn: ISBN being looked up
+        """
+        self._drain_network_log(driver, keep=False)
+        self._lookup = {
+            'isbn': isbn,
+            'prefix': f"lookups/{len(self._index):04d}_{isbn}",
+            'steps': [],
+            'responses': [],
+        }
+
+    def capture(self, driver, step):
+        """
+        Capture responses received so far and the current page
+
+        Args:
+            driver: WebDriver
+            step: Step name ('guide', 'result', ...)
+        """
+        if self._lookup is None:
+            return
+        try:
+            self._drain_network_log(driver)
+            page_path = f"{self._lookup['prefix']}/pages/{len(self._lookup['steps']):02d}_{step}.html"
+            html = driver.execute_script("return document.documentElement.outerHTML")
+            self._archive.writestr(page_path, html)
+            self._lookup['steps'].append({
+                'name': step,
+                'url': driver.current_url,
+                'title': driver.title,
+                'page': page_path,
+            })
+            logger.info(f"[RECORD] Captured step '{step}' ({len(self._lookup['responses'])} responses so far)")
+        except Exception as e:
+            logger.warning(f"[RECORD] ⚠️ Failed to capture step '{step}': {e}")
+
+    def finish(self, driver, book_info, elapsed_seconds):
+        """
+        Finish recording a lookup
+
+        Args:
+            driver: WebDriver
+            book_info: Lookup result (None if failed)
+            elapsed_seconds: Lookup wall time
+        """
+        if self._lookup is None:
+            return
+        if not any(step['name'] == 'result' for step in self._lookup['steps']):
+            self.capture(driver, 'final')
+
+        lookup = self._lookup
+        manifest = {
+            'isbn': lookup['isbn'],
+            'recorded_at': time.strftime('%Y/%m/%d %H:%M:%S'),
+            'elapsed_seconds': round(elapsed_seconds, 3),
+            'result': book_info,
+            'steps': lookup['steps'],
+            'responses': lookup['responses'],
+        }
+        manifest_path = f"{lookup['prefix']}/manifest.json"
+        self._archive.writestr(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        self._index.append(manifest_path)
+        self._lookup = None
+
+    def close(self):
+        """Write the archive index and close the archive"""
+        if self._archive is None:
+            return
+        self._archive.writestr('index.json', json.dumps({'lookups': self._index}, indent=2))
+        self._archive.close()
+        self._archive = None
+        logger.info(f"[RECORD] ✅ Archive written: {self.archive_path} ({len(self._index)} lookups)")
+
+    def _drain_network_log(self, driver, keep=True):
+        """
+        Read pending network events and store response bodies
+
+        Args:
+            driver: WebDriver
+            keep: False to discard events (before a lookup starts)
+        """
+        for entry in driver.get_log('performance'):
+            if not keep:
+                continue
+            message = json.loads(entry['message'])['message']
+            if message.get('method') != 'Network.responseReceived':
+                continue
+
+            params = message['params']
+            response = params['response']
+            if not response.get('url', '').startswith('http'):
+                continue
+
+            record = {
+                'url': response['url'],
+                'status': response.get('status'),
+                'mime_type': response.get('mimeType', ''),
+                'body': None,
+            }
+            try:
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+                data = base64.b64decode(body['body']) if body.get('base64Encoded') else body['body'].encode('utf-8')
+                body_path = f"{self._lookup['prefix']}/responses/{len(self._lookup['responses']):04d}.bin"
+                self._archive.writestr(body_path, data)
+                record['body'] = body_path
+            except Exception as e:
+                # Redirects and evicted resources have no body
+                logger.debug(f"[RECORD] No body for {response['url']}: {e}")
+            self._lookup['responses'].append(record)
+
+
+class ReplayArchive:
+    """Read access to a recorded session archive"""
+
+    def __init__(self, archive_path):
+        """
+        Initialize
+
+        Args:
+            archive_path: Archive path (.zip)
+        """
+        self._archive = zipfile.ZipFile(archive_path)
+        index = json.loads(self._archive.read('index.json'))
+        self.lookups = [json.loads(self._archive.read(path)) for path in index['lookups']]
+        self.by_isbn = {lookup['isbn']: lookup for lookup in self.lookups}
+        self.assets = {}
+        for lookup in self.lookups:
+            for response in lookup['responses']:
+                if response['body']:
+                    self.assets.setdefault(response['url'], response)
+
+    def read(self, path):
+        return self._archive.read(path)
+
+    def page(self, lookup, names):
+        """
+        Get the recorded page for the first matching step
+
+        Args:
+            lookup: Lookup manifest
+            names: Step names in order of preference
+
+        Returns:
+            tuple: (step dict, html str) or (None, None)
+        """
+        for name in names:
+            for step in lookup['steps']:
+                if step['name'] == name:
+                    return step, self.read(step['page']).decode('utf-8')
+        return None, None
+
+
+class ReplayServer:
+    """Local HTTP server serving a recorded session"""
+
+    def __init__(self, archive_path):
+        """
+        Initialize and start serving on a free local port
+
+        Args:
+            archive_path: Archive path (.zip)
+        """
+        self.archive = ReplayArchive(archive_path)
+        handler = type('ReplayHandler', (_ReplayHandler,), {'archive': self.archive})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"[REPLAY] Serving {len(self.archive.lookups)} recorded lookups at {self.base_url}")
+
+    @property
+    def estimate_url(self):
+        return f"{self.base_url}/estimate/guide"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    archive = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+
+        if parsed.path == '/estimate/guide':
+            step, html = self.archive.page(self.archive.lookups[0], ['guide'])
+            return self._send_page(step, html)
+
+        if parsed.path == f'{REPLAY_PREFIX}/result':
+            isbn = parse_qs(parsed.query).get('isbn', [''])[0].strip()
+            lookup = self.archive.by_isbn.get(isbn)
+            if lookup is None:
+                return self._send(404, 'text/html', b'<html><body>Not recorded</body></html>')
+            step, html = self.archive.page(lookup, ['result', 'final'])
+            return self._send_page(step, html)
+
+        if parsed.path == f'{REPLAY_PREFIX}/asset':
+            url = unquote(parse_qs(parsed.query).get('u', [''])[0])
+            response = self.archive.assets.get(url)
+            if response is None:
+                return self._send(404, 'text/plain', b'')
+            return self._send(response['status'] or 200, response['mime_type'], self.archive.read(response['body']))
+
+        self._send(404, 'text/plain', b'')
+
+    def _send_page(self, step, html):
+        if step is None:
+            return self._send(404, 'text/html', b'<html><body>Not recorded</body></html>')
+        self._send(200, 'text/html; charset=utf-8', _rewrite_page(html, step['url'], self.archive.assets).encode('utf-8'))
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"[REPLAY] {format % args}")
+
+
+def _rewrite_page(html, page_url, assets):
+    """
+    Make a DOM snapshot replayable offline
+
+    Scripts are removed (the snapshot is already rendered), recorded
+    resources are pointed at the replay server and the search script is injected.
+
+    Args:
+        html: Recorded outerHTML
+        page_url: Original page URL
+        assets: Recorded responses keyed by URL
+
+    Returns:
+        str: Rewritten HTML
+    """
+    html = re.sub(r'<script\b[^>]*>.*?</script>', '', html, flags=re.S | re.I)
+
+    def replace(match):
+        url = urljoin(page_url, match.group(2))
+        if url in assets:
+            return f'{match.group(1)}="{REPLAY_PREFIX}/asset?u={quote(url, safe="")}"'
+        return match.group(0)
+
+    html = re.sub(r'\b(href|src)="([^"]+)"', replace, html)
+    if '</body>' in html:
+        return html.replace('</body>', REPLAY_SEARCH_SCRIPT + '</body>', 1)
+    return html + REPLAY_SEARCH_SCRIPT
+
+
+def main():
+    """Replay every recorded lookup and compare with the recorded result"""
+    parser = argparse.ArgumentParser(description='Replay a recorded ValueBooks session')
+    parser.add_argument('archive', help='Recorded session archive (.zip)')
+    parser.add_argument('--show-browser', action='store_true', help='Run Chrome with a window')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from book_price_fetcher import ValueBooksScraper
+
+    scraper = ValueBooksScraper(credentials_file=None, headless=not args.show_browser, replay_path=args.archive)
+    mismatches = 0
+    try:
+        for lookup in scraper.replay_server.archive.lookups:
+            isbn = lookup['isbn']
+            started = time.time()
+            try:
+                result = scraper.search_isbn_estimate(isbn)
+            except Exception as e:
+                # Browser errors are not recorded results: count as a mismatch
+                logger.error(f"[REPLAY] ❌ ISBN {isbn}: {e}")
+                result = None
+            elapsed = time.time() - started
+
+            expected = lookup['result']
+            matched = (result is None) == (expected is None) and (
+                result is None or (result['price'] == expected['price'] and result['title'] == expected['title'])
+            )
+            if not matched:
+                mismatches += 1
+            logger.info(f"[REPLAY] {'✅' if matched else '❌'} ISBN {isbn}: "
+                        f"replayed={result and result['price']} recorded={expected and expected['price']} "
+                        f"({elapsed:.2f}s, recorded {lookup['elapsed_seconds']:.2f}s)")
+    finally:
+        scraper.close()
+
+    logger.info(f"[REPLAY] Completed: {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
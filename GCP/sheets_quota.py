@@ -0,0 +1,248 @@
+"""
+Google Sheets APIのクォータ制御
+
+gspreadクライアントの全リクエスト（読み取り・書き込み）を1か所に集約し、
+1分あたりのクォータを超えないようにペース配分する。
+429/5xxエラーは指数バックオフで再試行する。
+追記（values:append）は再試行すると行が重複するため、429と送信前の接続エラーのみ再試行する。
+"""
+
+import random
+import threading
+import time
+import logging
+from collections import deque
+
+import gspread
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from oauth2client.service_account import ServiceAccountCredentials
+
+logger = logging.getLogger(__name__)
+
+# Sheets API default quota (per user, per minute)
+READ_REQUESTS_PER_MINUTE = 60
+WRITE_REQUESTS_PER_MINUTE = 60
+QUOTA_WINDOW_SECONDS = 60
+
+# Retry settings for 429 / 5xx responses
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+SHEETS_SCOPE = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+
+class SheetsQuotaGovernor:
+    """Paces Sheets API calls under the per-minute read/write quotas"""
+
+    def __init__(self, read_limit=READ_REQUESTS_PER_MINUTE, write_limit=WRITE_REQUESTS_PER_MINUTE,
+                 window_seconds=QUOTA_WINDOW_SECONDS, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE_SECONDS, backoff_max=BACKOFF_MAX_SECONDS):
+        """
+        Initialize
+
+        Args:
+            read_limit: Maximum read requests per window
+            write_limit: Maximum write requests per window
+            window_seconds: Length of the quota window in seconds
+            max_retries: Maximum retries for 429/5xx responses
+            backoff_base: Initial backoff in seconds
+            backoff_max: Upper bound of a single backoff in seconds
+        """
+        self.limits = {'read': read_limit, 'write': write_limit}
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._calls = {'read': deque(), 'write': deque()}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset per-run usage statistics"""
+        self.stats = {
+            'read': 0,
+            'write': 0,
+            'retries': 0,
+            'throttled': 0,
+            'wait_seconds': 0.0,
+            'backoff_seconds': 0.0,
+        }
+
+    def acquire(self, kind):
+        """
+        Block until a request of the given kind fits in the quota window
+
+        Args:
+            kind: 'read' or 'write'
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                calls = self._calls[kind]
+                while calls and now - calls[0] >= self.window_seconds:
+                    calls.popleft()
+
+                if len(calls) < self.limits[kind]:
+                    calls.append(now)
+                    self.stats[kind] += 1
+                    if waited > 0:
+                        self.stats['throttled'] += 1
+                        self.stats['wait_seconds'] += waited
+                    return waited
+
+                delay = self.window_seconds - (now - calls[0])
+
+            logger.info(f"[QUOTA] {kind} quota reached, waiting {delay:.1f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def call(self, kind, func, *args, idempotent=True, **kwargs):
+        """
+        Execute a Sheets API call within the quota, retrying 429/5xx responses
+
+        Args:
+            kind: 'read' or 'write'
+            func: Callable performing the HTTP request
+            idempotent: False for requests that must not be repeated once the server
+                        may have applied them (appends); these are only retried on 429
+                        and on connection errors raised before the request was sent
+
+        Returns:
+            Return value of func
+        """
+        attempt = 0
+        while True:
+            self.acquire(kind)
+            try:
+                return func(*args, **kwargs)
+            except (gspread.exceptions.APIError, requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                status = _status_code(e)
+                if isinstance(e, gspread.exceptions.APIError):
+                    retryable = status in (RETRYABLE_STATUS_CODES if idempotent else (429,))
+                else:
+                    retryable = idempotent or _request_not_sent(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) + random.uniform(0, 1)
+                attempt += 1
+                with self._lock:
+                    self.stats['retries'] += 1
+                    self.stats['backoff_seconds'] += delay
+                logger.warning(f"[QUOTA] {kind} request failed (status: {status}), "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def log_summary(self):
+        """Log quota usage and wait time for the current run"""
+        logger.info("============================================================")
+        logger.info("SHEETS API QUOTA USAGE")
+        logger.info("============================================================")
+        logger.info(f"Read requests: {self.stats['read']} (limit: {self.limits['read']}/{self.window_seconds}s)")
+        logger.info(f"Write requests: {self.stats['write']} (limit: {self.limits['write']}/{self.window_seconds}s)")
+        logger.info(f"Throttled requests: {self.stats['throttled']} (waited {self.stats['wait_seconds']:.1f}s)")
+        logger.info(f"Retries: {self.stats['retries']} (backoff {self.stats['backoff_seconds']:.1f}s)")
+        logger.info("============================================================")
+
+
+class QuotaGovernedClient:
+    """gspread client wrapper routing every request through a SheetsQuotaGovernor"""
+
+    def __init__(self, client, governor):
+        """
+        Initialize
+
+        Args:
+            client: gspread.Client
+            governor: SheetsQuotaGovernor
+        """
+        self._client = client
+        self.governor = governor
+
+        # gspread>=6 keeps the transport in client.http_client
+        transport = getattr(client, 'http_client', client)
+        session = getattr(transport, 'session', None)
+        if session is not None:
+            # Keep connections alive across all reads and writes
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount('https://', adapter)
+
+        raw_request = transport.request
+
+        def governed_request(method, *args, **kwargs):
+            kind = 'read' if method.lower() == 'get' else 'write'
+            endpoint = args[0] if args else kwargs.get('endpoint', '')
+            # values:append (append_row/append_rows) is not idempotent
+            idempotent = ':append' not in str(endpoint)
+            return governor.call(kind, raw_request, method, *args, idempotent=idempotent, **kwargs)
+
+        # Spreadsheet/Worksheet objects call the transport directly,
+        # so the hook has to live on the wrapped instance
+        transport.request = governed_request
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _status_code(error):
+    """
+    Get HTTP status code from a Sheets API error
+
+    Args:
+        error: Exception raised by gspread/requests
+
+    Returns:
+        int: Status code (None if unavailable)
+    """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def _request_not_sent(error):
+    """
+    Check whether a connection error happened before the request reached the server
+
+    Args:
+        error: requests exception
+
+    Returns:
+        bool: True if the request was certainly not sent
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # MaxRetryError wrapping a failed connect / name resolution
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def create_sheets_client(credentials_file, governor=None):
+    """
+    Create a quota-governed gspread client
+
+    Args:
+        credentials_file: Credentials file path
+        governor: SheetsQuotaGovernor (a new one is created if None)
+
+    Returns:
+        QuotaGovernedClient: Google Sheets client
+    """
+    credentials = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, SHEETS_SCOPE)
+    client = gspread.authorize(credentials)
+    return QuotaGovernedClient(client, governor or SheetsQuotaGovernor())
@@ -0,0 +1,98 @@
+"""
+買取業者サイトの代替ページ（ローカルテスト用）
+
+ValueBooksの見積ページと同じ構造（検索フォーム、buy-price要素、該当なしメッセージ）を
+ローカルHTTPサーバーで配信する。アダプターや負荷テストをネットワークなしで実行するために使う。
+
+使い方:
+    server = StandinServer({'9784000000000': ('テスト書籍', 150)})
+    scraper.estimate_url = server.estimate_url
+"""
+
+import html
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+GUIDE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>買取価格を調べる</title></head>
+<body>
+<div class="search-input"><input type="search" placeholder="気になる本を検索"></div>
+<script>
+document.querySelector('input').addEventListener('keydown', function (e) {
+  if (e.key === 'Enter') {
+    location.href = '/estimate/result?isbn=' + encodeURIComponent(e.target.value);
+  }
+});
+</script>
+</body></html>"""
+
+RESULT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>買取価格</title></head>
+<body><h1>%s</h1><p>買取価格 <span class="buy-price">%d円</span></p></body></html>"""
+
+NOT_FOUND_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>買取価格</title></head>
+<body><div class="v-card__text">該当する商品は見つかりませんでした</div></body></html>"""
+
+
+class StandinServer:
+    """Local stand-in for a buyer's estimate pages"""
+
+    def __init__(self, books, latency=0.0):
+        """
+        Initialize and start serving on a free local port
+
+        Args:
+            books: Dict ISBN -> (title, price); other ISBNs show the "not found" message
+            latency: Seconds added to every response (simulates a slow site)
+        """
+        handler = type('StandinHandler', (_StandinHandler,), {'books': books, 'latency': latency})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"[STANDIN] Serving {len(books)} books at {self.base_url}")
+
+    @property
+    def estimate_url(self):
+        return f"{self.base_url}/estimate/guide"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    books = {}
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+        parsed = urlparse(self.path)
+        if parsed.path == '/estimate/guide':
+            return self._send(200, GUIDE_PAGE)
+        if parsed.path == '/estimate/result':
+            isbn = parse_qs(parsed.query).get('isbn', [''])[0].strip()
+            if isbn not in self.books:
+                return self._send(200, NOT_FOUND_PAGE)
+            title, price = self.books[isbn]
+            return self._send(200, RESULT_PAGE % (html.escape(title), price))
+        self._send(404, '')
+
+    def _send(self, status, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"[STANDIN] {format % args}")
@@ -0,0 +1,612 @@
+"""
+価格データの保存先（ストレージバックエンド）
+
+- SheetsPriceStore: Googleスプレッドシートを直接読み書きする（従来の動作）
+- SQLitePriceStore: ローカルのSQLiteを正とし、定期的にスプレッドシートへ一括同期する
+
+ISBNリストシート列構成は book_price_fetcher.py を参照
+"""
+
+import json
+import sqlite3
+import time
+import logging
+from datetime import datetime
+
+from gspread.exceptions import WorksheetNotFound
+
+from retry_queue import RETRY_QUEUE_HEADER
+
+logger = logging.getLogger(__name__)
+
+ISBN_LIST_SHEET = 'ISBNリスト'
+PRICE_HISTORY_SHEET = '価格履歴'
+ERROR_LOG_SHEET = 'エラーログ'
+RETRY_QUEUE_SHEET = '再試行キュー'
+
+# Interval between bulk syncs to the spreadsheet (SQLite backend)
+SYNC_INTERVAL_SECONDS = 300
+
+
+def select_due_records(records, today_date, limit, priority_isbns=(), skip_isbns=()):
+    """
+    Select records not updated today
+
+    Args:
+        records: Records of ISBNリスト (list of dict, header keys)
+        today_date: Today's date string (YYYY/MM/DD)
+        limit: Maximum number of records to select
+        priority_isbns: ISBNs selected before any other record (retry queue)
+        skip_isbns: ISBNs never selected (quarantined)
+
+    Returns:
+        tuple: (list of {row, record, isbn}, number of records already updated today)
+    """
+    priority_isbns = set(priority_isbns)
+    skip_isbns = set(skip_isbns)
+    prioritized = []
+    due = []
+    already_updated_count = 0
+
+    for idx, record in enumerate(records, start=2):  # start=2 for row number
+        isbn = str(record.get('ISBN', '')).strip()
+
+        if not isbn:
+            continue
+
+        if isbn in skip_isbns:
+            logger.debug(f"  Row {idx} (ISBN {isbn}): Quarantined, skipping")
+            continue
+
+        # Check if already updated today (compare date part only)
+        # Format: "2025/12/05 12:34:56" or "2025/12/05"
+        update_date = str(record.get('価格更新日時', '')).strip().split(' ')[0]
+        if update_date == today_date:
+            already_updated_count += 1
+            logger.debug(f"  Row {idx} (ISBN {isbn}): Already updated today, skipping")
+            continue
+
+        entry = {
+            'row': idx,
+            'record': record,
+            'isbn': isbn
+        }
+        if isbn in priority_isbns:
+            prioritized.append(entry)
+        elif len(due) < limit:
+            due.append(entry)
+
+        # Keep scanning only while retry-queue ISBNs may still follow
+        if len(due) >= limit and len(prioritized) >= len(priority_isbns):
+            logger.info(f"  Reached maximum process count ({limit}), stopping filter")
+            break
+
+    if prioritized:
+        logger.info(f"  Retry queue ISBNs first: {', '.join(entry['isbn'] for entry in prioritized)}")
+    return (prioritized + due)[:limit], already_updated_count
+
+
+class PriceStore:
+    """
+    Storage backend interface
+
+    Price updates passed to write_price_results are dicts:
+        item: Item returned by load_due_rows
+        title: Title to fill in (None to keep the current one)
+        price: New price
+        update_time: Update datetime string
+        change: Price change (None for first registration)
+        buyer: Buyer with the best offer (optional, column I)
+    """
+
+    def load_due_rows(self, today_date, limit, priority_isbns=(), skip_isbns=()):
+        """
+        Load rows not updated today
+
+        Args:
+            today_date: Today's date string (YYYY/MM/DD)
+            limit: Maximum number of rows
+            priority_isbns: ISBNs loaded before any other row (retry queue)
+            skip_isbns: ISBNs never loaded (quarantined)
+
+        Returns:
+            tuple: (list of {row, record, isbn}, total record count, already updated count)
+        """
+        raise NotImplementedError
+
+    def write_price_results(self, updates):
+        """
+        Write price results
+
+        Args:
+            updates: List of price update dicts
+        """
+        raise NotImplementedError
+
+    def append_price_history(self, rows):
+        """
+        Append rows to price history
+
+        Args:
+            rows: List of [ISBN, title, datetime, price, change]
+        """
+        raise NotImplementedError
+
+    def write_execution_summary(self, row):
+        """
+        Append execution summary row
+
+        Args:
+            row: [実行日時, 処理件数, 成功件数, 失敗件数, 成功率, 失敗ISBN]
+        """
+        raise NotImplementedError
+
+    def load_retry_queue(self):
+        """
+        Load the retry queue
+
+        Returns:
+            list: Rows in RETRY_QUEUE_HEADER order
+        """
+        raise NotImplementedError
+
+    def save_retry_queue(self, rows):
+        """
+        Replace the retry queue
+
+        Args:
+            rows: Rows in RETRY_QUEUE_HEADER order
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """Push pending changes (no-op unless the backend buffers)"""
+
+    def close(self):
+        """Release resources"""
+        self.flush()
+
+
+class SheetsPriceStore(PriceStore):
+    """Store reading and writing the spreadsheet directly via gspread"""
+
+    def __init__(self, sheet_client, spreadsheet_id):
+        """
+        Initialize
+
+        Args:
+            sheet_client: gspread client
+            spreadsheet_id: Google Spreadsheet ID
+        """
+        logger.info(f"Opening spreadsheet: {spreadsheet_id}")
+        self.spreadsheet = sheet_client.open_by_key(spreadsheet_id)
+        self.sheet = self.spreadsheet.worksheet(ISBN_LIST_SHEET)
+        self._history_sheet = None
+
+    @property
+    def history_sheet(self):
+        if self._history_sheet is None:
+            self._history_sheet = self.spreadsheet.worksheet(PRICE_HISTORY_SHEET)
+        return self._history_sheet
+
+    def load_due_rows(self, today_date, limit, priority_isbns=(), skip_isbns=()):
+        records = self.sheet.get_all_records()
+        logger.info(f"Total records retrieved: {len(records)}")
+        due, already_updated_count = select_due_records(records, today_date, limit, priority_isbns, skip_isbns)
+        return due, len(records), already_updated_count
+
+    def write_price_results(self, updates):
+        data = []
+        for update in updates:
+            row = update['item']['row']
+            if update.get('title'):
+                data.append({'range': f'B{row}', 'values': [[update['title']]]})
+            data.append({'range': f'E{row}:F{row}', 'values': [[update['price'], update['update_time']]]})
+            if update.get('change') is not None:
+                data.append({'range': f'G{row}', 'values': [[update['change']]]})
+            if update.get('buyer'):
+                data.append({'range': f'I{row}', 'values': [[update['buyer']]]})
+
+        if data:
+            self.sheet.batch_update(data, value_input_option='USER_ENTERED')
+
+    def append_price_history(self, rows):
+        if rows:
+            self.history_sheet.append_rows(rows)
+
+    def write_execution_summary(self, row):
+        self.spreadsheet.worksheet(ERROR_LOG_SHEET).append_row(row)
+
+    def load_retry_queue(self):
+        try:
+            sheet = self.spreadsheet.worksheet(RETRY_QUEUE_SHEET)
+        except WorksheetNotFound:
+            return []
+        return sheet.get_all_values()[1:]
+
+    def save_retry_queue(self, rows):
+        try:
+            sheet = self.spreadsheet.worksheet(RETRY_QUEUE_SHEET)
+        except WorksheetNotFound:
+            if not rows:
+                return
+            sheet = self.spreadsheet.add_worksheet(title=RETRY_QUEUE_SHEET, rows=1000, cols=len(RETRY_QUEUE_HEADER))
+            sheet.update(range_name='A1:G1', values=[RETRY_QUEUE_HEADER])
+            logger.info(f"Created new sheet: {RETRY_QUEUE_SHEET}")
+
+        sheet.batch_clear(['A2:G'])
+        if rows:
+            sheet.update(range_name=f'A2:G{len(rows) + 1}', values=rows, value_input_option='RAW')
+
+    def read_isbn_list(self):
+        """
+        Read all values of ISBNリスト (one request)
+
+        Returns:
+            list: Rows including the header row
+        """
+        return self.sheet.get_all_values()
+
+
+class SQLitePriceStore(PriceStore):
+    """Store using a local SQLite database as the system of record, synced to the spreadsheet"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS books (
+            isbn TEXT PRIMARY KEY,
+            row_order INTEGER,
+            title TEXT,
+            author TEXT,
+            publisher TEXT,
+            latest_price INTEGER,
+            updated_at TEXT,
+            updated_date TEXT,
+            price_change INTEGER,
+            buyer TEXT,
+            dirty INTEGER DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_books_updated_date ON books (updated_date, row_order);
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            isbn TEXT,
+            title TEXT,
+            price_date TEXT,
+            price INTEGER,
+            change INTEGER,
+            synced INTEGER DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_price_history_synced ON price_history (synced);
+        CREATE TABLE IF NOT EXISTS execution_summary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            executed_at TEXT,
+            total_count INTEGER,
+            success_count INTEGER,
+            error_count INTEGER,
+            success_rate TEXT,
+            failed_isbns TEXT,
+            synced INTEGER DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS retry_queue (
+            isbn TEXT PRIMARY KEY,
+            error_class TEXT,
+            attempts INTEGER,
+            last_error TEXT,
+            first_failed_at TEXT,
+            last_failed_at TEXT,
+            status TEXT
+        );
+    """
+
+    def __init__(self, db_path, mirror=None, sync_interval=SYNC_INTERVAL_SECONDS):
+        """
+        Initialize
+
+        Args:
+            db_path: SQLite database file path
+            mirror: SheetsPriceStore to sync with (None for local only)
+            sync_interval: Minimum seconds between periodic syncs
+        """
+        logger.info(f"Opening SQLite store: {db_path}")
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self._migrate()
+        self.conn.commit()
+        self.mirror = mirror
+        self.sync_interval = sync_interval
+        self._last_sync = time.monotonic()
+        self._retry_queue_dirty = False
+
+        if self.mirror:
+            self.pull_from_sheets()
+
+    def _migrate(self):
+        """Add columns missing from databases created by older versions"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(books)")}
+        if 'buyer' not in columns:
+            self.conn.execute("ALTER TABLE books ADD COLUMN buyer TEXT")
+        if 'dirty' not in columns:
+            # Unknown sync state: push every row once
+            self.conn.execute("ALTER TABLE books ADD COLUMN dirty INTEGER DEFAULT 0")
+            self.conn.execute("UPDATE books SET dirty = 1")
+
+    def load_due_rows(self, today_date, limit, priority_isbns=(), skip_isbns=()):
+        total = self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        already_updated_count = self.conn.execute(
+            "SELECT COUNT(*) FROM books WHERE updated_date = ?", (today_date,)
+        ).fetchone()[0]
+        rows = self.conn.execute(
+            """
+            SELECT isbn, row_order, title, latest_price, updated_at FROM books
+            WHERE (updated_date IS NULL OR updated_date != ?)
+              AND isbn NOT IN (SELECT value FROM json_each(?))
+            ORDER BY isbn IN (SELECT value FROM json_each(?)) DESC, row_order LIMIT ?
+            """,
+            (today_date, json.dumps(list(skip_isbns)), json.dumps(list(priority_isbns)), limit)
+        ).fetchall()
+        logger.info(f"Total records in store: {total}")
+
+        due = []
+        for isbn, row_order, title, latest_price, updated_at in rows:
+            due.append({
+                'row': row_order,
+                'record': {
+                    'ISBN': isbn,
+                    '書籍名': title or '',
+                    '最新見積価格': '' if latest_price is None else latest_price,
+                    '価格更新日時': updated_at or ''
+                },
+                'isbn': isbn
+            })
+        return due, total, already_updated_count
+
+    def write_price_results(self, updates):
+        for update in updates:
+            self.conn.execute(
+                """
+                UPDATE books SET
+                    title = COALESCE(?, title),
+                    latest_price = ?,
+                    updated_at = ?,
+                    updated_date = ?,
+                    price_change = COALESCE(?, price_change),
+                    buyer = COALESCE(?, buyer),
+                    dirty = 1
+                WHERE isbn = ?
+                """,
+                (update.get('title'), update['price'], update['update_time'],
+                 update['update_time'].split(' ')[0], update.get('change'), update.get('buyer'),
+                 update['item']['isbn'])
+            )
+        self.conn.commit()
+
+    def append_price_history(self, rows):
+        self.conn.executemany(
+            "INSERT INTO price_history (isbn, title, price_date, price, change) VALUES (?, ?, ?, ?, ?)",
+            [tuple(row) for row in rows]
+        )
+        self.conn.commit()
+
+    def write_execution_summary(self, row):
+        self.conn.execute(
+            """
+            INSERT INTO execution_summary
+                (executed_at, total_count, success_count, error_count, success_rate, failed_isbns)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            tuple(row)
+        )
+        self.conn.commit()
+
+    def load_retry_queue(self):
+        return [list(row) for row in self.conn.execute(
+            """
+            SELECT isbn, error_class, attempts, last_error, first_failed_at, last_failed_at, status
+            FROM retry_queue
+            """
+        )]
+
+    def save_retry_queue(self, rows):
+        with self.conn:
+            self.conn.execute("DELETE FROM retry_queue")
+            self.conn.executemany("INSERT INTO retry_queue VALUES (?, ?, ?, ?, ?, ?, ?)", [tuple(row) for row in rows])
+        self._retry_queue_dirty = True
+
+    def flush(self):
+        if self.mirror and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.push_to_sheets()
+
+    def close(self):
+        try:
+            if self.mirror:
+                self.push_to_sheets()
+        finally:
+            self.conn.close()
+
+    def pull_from_sheets(self):
+        """
+        Import ISBNs and book metadata from ISBNリスト (one read)
+
+        New ISBNs are inserted with the prices currently in the sheet.
+        ISBNs removed from the sheet (e.g. moved to 買取完了) are deleted.
+        Prices of known ISBNs (E〜G) are taken from the sheet only when its
+        価格更新日時 is newer than the store's, e.g. after a manual edit.
+        """
+        values = self.mirror.read_isbn_list()
+        stored_updated_at = dict(self.conn.execute("SELECT isbn, updated_at FROM books"))
+        books = []
+        sheet_newer = []
+        for row_order, row in enumerate(values[1:], start=2):
+            row = row + [''] * (7 - len(row))
+            isbn = str(row[0]).strip()
+            if not isbn:
+                continue
+            updated_at = str(row[5]).strip() or None
+            updated_date = updated_at.split(' ')[0] if updated_at else None
+            timestamp = _parse_timestamp(updated_at)
+            if timestamp:
+                # Same format as today_date in load_due_rows, even if the sheet drops zero padding
+                updated_date = timestamp.strftime('%Y/%m/%d')
+            books.append((isbn, row_order, row[1], row[2], row[3],
+                          _to_int(row[4]), updated_at, updated_date, _to_int(row[6])))
+            if isbn in stored_updated_at and _is_newer(updated_at, stored_updated_at[isbn]):
+                sheet_newer.append((_to_int(row[4]), updated_at, updated_date, _to_int(row[6]), isbn))
+
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS sheet_isbns (isbn TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM sheet_isbns")
+            self.conn.executemany("INSERT OR IGNORE INTO sheet_isbns VALUES (?)", [(b[0],) for b in books])
+            self.conn.execute("DELETE FROM books WHERE isbn NOT IN (SELECT isbn FROM sheet_isbns)")
+            self.conn.executemany(
+                """
+                INSERT INTO books (isbn, row_order, title, author, publisher,
+                                   latest_price, updated_at, updated_date, price_change)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(isbn) DO UPDATE SET
+                    row_order = excluded.row_order,
+                    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE books.title END,
+                    author = excluded.author,
+                    publisher = excluded.publisher
+                """,
+                books
+            )
+            self.conn.executemany(
+                """
+                UPDATE books SET
+                    latest_price = ?,
+                    updated_at = ?,
+                    updated_date = ?,
+                    price_change = ?,
+                    dirty = 0
+                WHERE isbn = ?
+                """,
+                sheet_newer
+            )
+        logger.info(f"[SYNC] Pulled {len(books)} ISBNs from spreadsheet "
+                    f"({len(sheet_newer)} with newer prices in the sheet)")
+
+        # The sheet copy of the retry queue wins (quarantine can be released by editing it)
+        retry_rows = [row + [''] * (len(RETRY_QUEUE_HEADER) - len(row)) for row in self.mirror.load_retry_queue()]
+        with self.conn:
+            self.conn.execute("DELETE FROM retry_queue")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO retry_queue VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [tuple(row[:len(RETRY_QUEUE_HEADER)]) for row in retry_rows if str(row[0]).strip()]
+            )
+
+    def push_to_sheets(self):
+        """
+        Bulk-sync prices, price history and execution summaries to the spreadsheet
+
+        Only books changed since the last sync (dirty) are written, located by
+        ISBN in the current sheet: one batch update with an E:G range per row
+        (plus the buyer and titles for rows with an empty title). History and
+        summaries are written with one append each.
+        """
+        logger.info("[SYNC] Syncing SQLite store to spreadsheet...")
+        changed = self.conn.execute(
+            "SELECT isbn, title, latest_price, updated_at, price_change, buyer FROM books WHERE dirty = 1"
+        ).fetchall()
+
+        data = []
+        if changed:
+            # Rows may have moved since the pull (rows deleted or inserted in the sheet)
+            sheet_rows = {}
+            for row_number, row in enumerate(self.mirror.read_isbn_list()[1:], start=2):
+                if row:
+                    sheet_rows.setdefault(str(row[0]).strip(), []).append((row_number, row))
+
+            for isbn, title, latest_price, updated_at, price_change, buyer in changed:
+                for row_number, row in sheet_rows.get(isbn, []):
+                    data.append({'range': f'E{row_number}:G{row_number}', 'values': [[
+                        '' if latest_price is None else latest_price,
+                        updated_at or '',
+                        '' if price_change is None else price_change
+                    ]]})
+                    if title and not (len(row) > 1 and row[1]):
+                        data.append({'range': f'B{row_number}', 'values': [[title]]})
+                    if buyer:
+                        data.append({'range': f'I{row_number}', 'values': [[buyer]]})
+
+            if data:
+                self.mirror.sheet.batch_update(data, value_input_option='USER_ENTERED')
+            # ISBNs no longer in the sheet are deleted by the next pull
+            self.conn.executemany("UPDATE books SET dirty = 0 WHERE isbn = ?", [(row[0],) for row in changed])
+
+        history = self.conn.execute(
+            "SELECT id, isbn, title, price_date, price, change FROM price_history WHERE synced = 0 ORDER BY id"
+        ).fetchall()
+        if history:
+            self.mirror.append_price_history([list(row[1:]) for row in history])
+            self.conn.execute("UPDATE price_history SET synced = 1 WHERE id <= ?", (history[-1][0],))
+
+        summaries = self.conn.execute(
+            """
+            SELECT id, executed_at, total_count, success_count, error_count, success_rate, failed_isbns
+            FROM execution_summary WHERE synced = 0 ORDER BY id
+            """
+        ).fetchall()
+        for summary in summaries:
+            self.mirror.write_execution_summary(list(summary[1:]))
+            self.conn.execute("UPDATE execution_summary SET synced = 1 WHERE id = ?", (summary[0],))
+
+        if self._retry_queue_dirty:
+            self.mirror.save_retry_queue(self.load_retry_queue())
+            self._retry_queue_dirty = False
+
+        self.conn.commit()
+        self._last_sync = time.monotonic()
+        logger.info(f"[SYNC] ✅ Synced {len(changed)} changed rows, {len(history)} history rows, "
+                    f"{len(summaries)} summaries")
+
+
+def _is_newer(updated_at, other):
+    """
+    Check whether a 価格更新日時 value is newer than another
+
+    Args:
+        updated_at: Timestamp (e.g. "2025/12/05 10:00:00")
+        other: Timestamp to compare with
+
+    Returns:
+        bool: True if updated_at is set and newer (or other is empty or unparseable)
+    """
+    timestamp = _parse_timestamp(updated_at)
+    if timestamp is None:
+        return False
+    other_timestamp = _parse_timestamp(other)
+    return other_timestamp is None or timestamp > other_timestamp
+
+
+def _parse_timestamp(value):
+    """
+    Parse a 価格更新日時 value (the sheet may drop zero padding or seconds)
+
+    Args:
+        value: Cell value
+
+    Returns:
+        datetime: Parsed value (None if empty or not a timestamp)
+    """
+    text = str(value or '').strip()
+    for fmt in ('%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _to_int(value):
+    """
+    Convert a cell value to int
+
+    Args:
+        value: Cell value
+
+    Returns:
+        int: Converted value (None if empty or not a number)
+    """
+    try:
+        return int(str(value).replace(',', '').replace('¥', '').replace('円', '').strip())
+    except (ValueError, TypeError):
+        return None
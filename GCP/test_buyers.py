@@ -0,0 +1,150 @@
+"""
+buyers.py のテスト
+
+- 業者名の重複排除と、同じブラウザを使うアダプターの直列化（ブラウザ不要）
+- BuyerComparator の同時問い合わせ（standin_pages.py の代替ページ相手、Chromeがない環境ではスキップ）
+
+使い方:
+    cd GCP
+    python -m unittest test_buyers
+"""
+
+import threading
+import time
+import unittest
+
+from buyers import BuyerComparator, ValueBooksAdapter, create_adapters
+from standin_pages import StandinServer
+
+
+class FastValueBooksAdapter(ValueBooksAdapter):
+    """ValueBooks adapter without the 2-second rate limit (own limiter, keyed by name)"""
+
+    name = 'ValueBooksTest'
+    request_interval = 0
+
+
+class StandinAdapter(ValueBooksAdapter):
+    """Second buyer for the tests: the ValueBooks page structure on another stand-in server"""
+
+    name = 'Standin'
+    request_interval = 0
+
+
+class ConcurrencyTracker:
+    """Counts lookups running at the same time"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+
+class FakeScraper:
+    """Stands in for ValueBooksScraper (a lookup takes 0.2 seconds)"""
+
+    def __init__(self, price, tracker=None):
+        self.price = price
+        self.browser_lock = threading.Lock()
+        self.tracker = tracker or ConcurrencyTracker()
+
+    def search_isbn_estimate(self, isbn):
+        self.tracker.enter()
+        time.sleep(0.2)
+        self.tracker.leave()
+        return {'isbn': isbn, 'title': 'テスト書籍', 'author': '', 'publisher': '',
+                'price': self.price, 'price_date': '2025/12/05 10:00:00'}
+
+
+class CreateAdaptersTest(unittest.TestCase):
+
+    def test_duplicate_names_create_one_adapter(self):
+        adapters = create_adapters(['valuebooks', ' ValueBooks '], FakeScraper(150))
+        self.assertEqual([adapter.name for adapter in adapters], ['ValueBooks'])
+
+    def test_unknown_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_adapters(['unknown'], FakeScraper(150))
+
+    def test_comparator_rejects_adapters_with_the_same_name(self):
+        scraper = FakeScraper(150)
+        with self.assertRaises(ValueError):
+            BuyerComparator([ValueBooksAdapter(scraper), ValueBooksAdapter(scraper)])
+
+
+class SharedBrowserTest(unittest.TestCase):
+
+    def test_adapters_sharing_a_browser_take_turns(self):
+        scraper = FakeScraper(150)
+        comparator = BuyerComparator([FastValueBooksAdapter(scraper), StandinAdapter(scraper)])
+        self.addCleanup(comparator.close)
+
+        result = comparator.lookup('9784000000000')
+
+        self.assertEqual(scraper.tracker.max_active, 1)
+        self.assertEqual(result['offers'], {'ValueBooksTest': 150, 'Standin': 150})
+
+    def test_adapters_with_their_own_browsers_run_concurrently(self):
+        tracker = ConcurrencyTracker()
+        valuebooks, standin = FakeScraper(150, tracker), FakeScraper(300, tracker)
+        comparator = BuyerComparator([FastValueBooksAdapter(valuebooks), StandinAdapter(standin)])
+        self.addCleanup(comparator.close)
+
+        result = comparator.lookup('9784000000000')
+
+        self.assertEqual(tracker.max_active, 2)
+        self.assertEqual((result['buyer'], result['price']), ('Standin', 300))
+
+
+def _start_scraper(estimate_url):
+    """Start a headless ValueBooksScraper pointed at a stand-in server (skips the test without Chrome)"""
+    from book_price_fetcher import ValueBooksScraper
+    try:
+        scraper = ValueBooksScraper(credentials_file=None, headless=True)
+    except Exception as e:
+        raise unittest.SkipTest(f"Chrome is not available: {e}")
+    scraper.estimate_url = estimate_url
+    return scraper
+
+
+class ComparatorStandinTest(unittest.TestCase):
+    """Concurrent comparison with real browsers against the stand-in pages"""
+
+    def setUp(self):
+        self.valuebooks_server = StandinServer({'9784000000000': ('テスト書籍', 150)})
+        self.standin_server = StandinServer({'9784000000000': ('テスト書籍', 300),
+                                             '9784000000001': ('別の書籍', 80)})
+        self.addCleanup(self.valuebooks_server.close)
+        self.addCleanup(self.standin_server.close)
+        self.valuebooks_scraper = _start_scraper(self.valuebooks_server.estimate_url)
+        self.addCleanup(self.valuebooks_scraper.close)
+        self.standin_scraper = _start_scraper(self.standin_server.estimate_url)
+        self.addCleanup(self.standin_scraper.close)
+        self.comparator = BuyerComparator([ValueBooksAdapter(self.valuebooks_scraper),
+                                           StandinAdapter(self.standin_scraper)])
+        self.addCleanup(self.comparator.close)
+
+    def test_best_offer_is_selected(self):
+        result = self.comparator.lookup('9784000000000')
+
+        self.assertEqual((result['buyer'], result['price']), ('Standin', 300))
+        self.assertEqual(result['offers'], {'ValueBooks': 150, 'Standin': 300})
+
+    def test_not_found_counts_as_zero_offer(self):
+        result = self.comparator.lookup('9784000000001')
+
+        self.assertEqual((result['buyer'], result['price']), ('Standin', 80))
+        self.assertEqual(result['offers'], {'ValueBooks': 0, 'Standin': 80})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+PriceLookupService のテスト（ブラウザ不要）
+
+ブラウザの代わりに FakeScraper を使い、ブラウザ異常時の再起動と、
+再起動に失敗したブラウザがプールから外れて新しいブラウザに置き換わることを確認する。
+
+使い方:
+    cd GCP
+    python -m unittest test_price_lookup
+"""
+
+import tempfile
+import unittest
+
+from price_cache import PriceCache
+from price_lookup import PriceLookupService
+
+
+class FakeScraper:
+    """Stands in for ValueBooksScraper: returns queued outcomes, one per lookup"""
+
+    def __init__(self, outcomes, restart_error=None):
+        self.driver = object()
+        self.outcomes = list(outcomes)
+        self.restart_error = restart_error
+        self.restarts = 0
+        self.closed = False
+
+    def _fetch_price(self, item):
+        if self.driver is None:
+            raise AttributeError("'NoneType' object has no attribute 'get'")
+        error_type = self.outcomes.pop(0) if self.outcomes else None
+        if error_type:
+            return {'item': item, 'result': None, 'error_type': error_type, 'error': 'invalid session id'}
+        result = {'isbn': item['isbn'], 'title': 'テスト書籍', 'author': '', 'publisher': '',
+                  'price': 150, 'price_date': '2025/12/05 10:00:00'}
+        return {'item': item, 'result': result, 'error_type': None, 'error': None}
+
+    def _recycle_driver(self):
+        # Same order as ValueBooksScraper._recycle_driver: the old driver is dropped first
+        self.restarts += 1
+        self.driver = None
+        if self.restart_error:
+            raise self.restart_error
+        self.driver = object()
+
+    def close(self):
+        self.closed = True
+
+
+class PriceLookupServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = PriceCache(f'{self.cache_dir.name}/price_cache.db')
+        self.created = []
+        self.next_scrapers = []
+
+    def tearDown(self):
+        self.cache.close()
+        self.cache_dir.cleanup()
+
+    def create_service(self):
+        def factory():
+            scraper = self.next_scrapers.pop(0)
+            self.created.append(scraper)
+            return scraper
+        service = PriceLookupService(self.cache, factory, browsers=1, timeout=5)
+        self.addCleanup(service.close)
+        return service
+
+    def test_browser_is_restarted_after_driver_error(self):
+        scraper = FakeScraper(['SELENIUM_ERROR', None])
+        self.next_scrapers = [scraper]
+        service = self.create_service()
+
+        self.assertEqual(service.lookup(['9784000000000'])[0]['status'], 'error')
+        self.assertEqual(scraper.restarts, 1)
+
+        result = service.lookup(['9784000000000'])[0]
+        self.assertEqual((result['status'], result['price']), ('ok', 150))
+        self.assertEqual(self.created, [scraper])
+
+    def test_browser_is_not_restarted_after_lookup_failure(self):
+        scraper = FakeScraper(['LOOKUP_FAILED'])
+        self.next_scrapers = [scraper]
+        service = self.create_service()
+
+        self.assertEqual(service.lookup(['9784000000000'])[0]['error_type'], 'LOOKUP_FAILED')
+        self.assertEqual(scraper.restarts, 0)
+
+    def test_browser_is_replaced_when_restart_fails(self):
+        broken = FakeScraper(['SELENIUM_ERROR'], restart_error=RuntimeError('chrome not reachable'))
+        fresh = FakeScraper([None, None])
+        self.next_scrapers = [broken, fresh]
+        service = self.create_service()
+
+        result = service.lookup(['9784000000000'])[0]
+        self.assertEqual((result['status'], result['error_type']), ('error', 'SELENIUM_ERROR'))
+        self.assertTrue(broken.closed)
+        self.assertNotIn(broken, service._scrapers)
+
+        # Every later lookup gets the new browser, never the broken one
+        for isbn in ('9784000000001', '9784000000002'):
+            result = service.lookup([isbn])[0]
+            self.assertEqual((result['status'], result['price']), ('ok', 150))
+        self.assertEqual(self.created, [broken, fresh])
+        self.assertEqual(service._scrapers, [fresh])
+
+
+if __name__ == '__main__':
+    unittest.main()